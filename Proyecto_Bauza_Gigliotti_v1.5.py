@@ -1,13 +1,142 @@
 import datetime
+from pathlib import Path
+
 import pandas as pd
-import matplotlib.pyplot as plt
 import streamlit as st
-import streamlit.components.v1 as components
-
 
-def plot_potencia(datos, fecha_inicio, fecha_fin, temporada, color):
-    # Filtrar los datos entre las fechas proporcionadas
-    subtabla = datos.loc[fecha_inicio:fecha_fin, :]
+from agregados_gfv import HEMISFERIOS
+from cache_gfv import CacheLRU, clave_parametros, hash_contenido
+from incremental_gfv import CalculoIncremental
+from incertidumbre_gfv import INCERTIDUMBRE_TIPICA, REMUESTREOS, AnalisisIncertidumbre
+from graficos_gfv import torta_png
+from instrumentacion_gfv import SIN_INSTRUMENTAR, Medidor
+from lectura_gfv import (DIRECTORIO_COLUMNAR, FORMATOS, cargar_columnar, columnas_ignoradas,
+                         convertir_a_columnar, es_columnar, leer_tabla)
+from modelo_gfv import CURVA_RENDIMIENTO_TIPICA, normalizar_curva, potencia_instantanea, temperatura_celda
+from reduccion_gfv import METODOS, reducir
+from vivo_gfv import ProcesoVivo
+
+
+@st.cache_resource
+def caches():
+    # compartidas entre sesiones y acotadas, para no acumular tablas en memoria
+    return {'tablas': CacheLRU(4), 'calculos': CacheLRU(4), 'resultados': CacheLRU(16),
+            'graficos': CacheLRU(64), 'tortas': CacheLRU(32), 'analisis': CacheLRU(4),
+            'incertidumbre': CacheLRU(8)}
+
+
+@st.cache_resource
+def archivo_estatico(nombre):
+    # imágenes del repositorio: se leen del disco una sola vez por proceso
+    return Path(nombre).read_bytes()
+
+
+def torta(valores, etiquetas, colores):
+    # la imagen se guarda según lo que muestra: cambiar otro control no la vuelve a dibujar
+    total = sum(valores)
+    clave = (tuple(round(valor / total, 6) for valor in valores), tuple(etiquetas), tuple(colores))
+    return caches()['tortas'].obtener(clave, lambda: torta_png(valores, etiquetas, colores))
+
+
+def calcular_resultados(calculo, tabla, inputs):
+    # un único escenario; calculo (uno por archivo) sólo recalcula las series que dependen
+    # de los parámetros que cambiaron desde la última vez
+    potencia, energia, resumen = calculo.calcular(inputs)
+
+    # copia superficial: no toca la tabla de la caché ni copia columnas mapeadas en memoria
+    tabla = tabla.copy(deep=False)
+    tabla['Potencia (kW)'] = potencia
+    # cada muestra vale hasta la siguiente (o el paso nominal si hay un hueco)
+    tabla['Energía (kWh)'] = energia
+    return tabla, resumen
+
+
+def actualizar_resultados(clave_archivo, tabla, inputs, medidor):
+    cache = caches()
+    clave = (clave_archivo, clave_parametros(inputs))
+    calculado = clave not in cache['resultados']
+    with medidor.etapa('cálculo de potencia y energía'):
+        calculo = cache['calculos'].obtener(clave_archivo, lambda: CalculoIncremental(tabla))
+        st.session_state['tabla'], st.session_state['resumen'] = cache['resultados'].obtener(
+            clave, lambda: calcular_resultados(calculo, tabla, inputs))
+    st.session_state['clave_resultados'] = clave
+    st.session_state['recalculados'] = list(calculo.recalculados) if calculado else []
+    ignoradas = columnas_ignoradas(tabla)
+    if ignoradas:
+        st.warning(f'Se ignoran las columnas {", ".join(map(str, ignoradas))}: sólo se usan G, T y una '
+                   'columna de viento cuyo nombre contenga "viento" o "wind".')
+
+
+def simular_incertidumbre(clave_archivo, tabla, inputs, realizaciones, remuestreo, incertidumbre):
+    # la serie preparada se guarda por archivo y las realizaciones por todo lo que las define;
+    # la semilla es fija para que volver a mostrar la sección dé los mismos percentiles
+    cache = caches()
+    clave = (clave_archivo, clave_parametros(inputs), realizaciones, remuestreo,
+             tuple(sorted(incertidumbre.items())))
+    analisis = cache['analisis'].obtener(clave_archivo, lambda: AnalisisIncertidumbre(tabla))
+    return cache['incertidumbre'].obtener(
+        clave, lambda: analisis.simular(inputs, realizaciones, incertidumbre, remuestreo, semilla=0))
+
+
+def panel_vivo(ruta, inputs, horas, hemisferio='sur'):
+    # corre como fragmento: en cada intervalo sólo se rehace este panel y sólo con las filas nuevas
+    clave = (ruta, clave_parametros(inputs))
+    if st.session_state.get('clave_vivo') != clave:
+        # otro archivo u otros parámetros: la historia se procesa una vez más
+        st.session_state['vivo'] = ProcesoVivo(ruta, [inputs])
+        st.session_state['clave_vivo'] = clave
+    proceso = st.session_state['vivo']
+    try:
+        nuevas = proceso.actualizar()
+    except (OSError, ValueError) as error:
+        st.error(f'No se pudo leer {ruta}: {error}')
+        return
+    resumen = proceso.resumen()
+    if resumen is None:
+        st.info('Esperando muestras del registrador...')
+        return
+
+    energia = resumen['energia'][0]
+    columna_total, columna_hoy, columna_ultima = st.columns(3)
+    columna_total.metric('Energía acumulada', f'{energia.sum():.1f} kWh')
+    columna_hoy.metric(f'Energía del {resumen.dias[-1]}', f'{energia[-1]:.2f} kWh')
+    columna_ultima.metric('Última muestra', f'{proceso.ultimo:%d/%m %H:%M}', f'{nuevas} filas nuevas',
+                          delta_color='off')
+    if proceso.descartadas:
+        st.caption(f'{proceso.descartadas} filas descartadas por llegar fuera de orden.')
+
+    st.subheader(f'Potencia de las últimas {horas} horas')
+    st.line_chart(reducir(proceso.potencia_reciente(horas), 1500).to_frame(),
+                  y='Potencia (kW)', x_label='Tiempo', y_label='Potencia entregada (kW)')
+    st.subheader('Energía diaria')
+    diaria = pd.DataFrame({'Energía (kWh)': energia}, index=pd.DatetimeIndex(resumen.dias))
+    st.bar_chart(diaria.tail(90), y='Energía (kWh)', x_label='Día', y_label='Energía (kWh)')
+
+    por_anio = pd.DataFrame({anio: {'Energía (kWh)': totales['energia'][0],
+                                    'Horas de funcionamiento': totales['horas_funcionamiento'][0]}
+                             for anio, totales in resumen.por_anio().items()}).T
+    por_estacion = pd.DataFrame({nombre: {'Energía (kWh)': totales['energia'][0]}
+                                 for nombre, totales in resumen.por_estacion(hemisferio).items()}).T
+    columna_anios, columna_estaciones = st.columns(2)
+    columna_anios.dataframe(por_anio, use_container_width=True)
+    columna_estaciones.dataframe(por_estacion, use_container_width=True)
+
+
+def plot_potencia(datos, resumen, temporada, color, hemisferio='sur', medidor=SIN_INSTRUMENTAR,
+                  clave=None, puntos=1500, metodo='minmax'):
+    # Las estadísticas salen del resumen diario; la tabla sólo se corta para el gráfico instantáneo
+    subresumen = resumen.estacion(temporada, hemisferio)
+
+    # al navegador sólo se envían unos puntos por gráfico, reducidos una vez por
+    # (resultados, rango de días, cantidad de puntos, método)
+    def serie_reducida():
+        return reducir(datos['Potencia (kW)'].iloc[subresumen.filas()], puntos, metodo).to_frame()
+
+    if clave is None or len(subresumen) == 0:
+        subtabla = serie_reducida()
+    else:
+        rango = (temporada, hemisferio, str(subresumen.dias[0]), str(subresumen.dias[-1]))
+        subtabla = caches()['graficos'].obtener((clave, rango, puntos, metodo), serie_reducida)
 
     # Mostrar el título y el gráfico de barras
     st.markdown(
@@ -20,15 +149,16 @@ def plot_potencia(datos, fecha_inicio, fecha_fin, temporada, color):
         """,
         unsafe_allow_html=True
     )
-    st.bar_chart(data=subtabla, y='Potencia (kW)', x_label='Tiempo',
-                 y_label='Potencia instantánea generada (kW)', color=color, use_container_width=True)
+    with medidor.etapa(f'{temporada}: potencia instantánea'):
+        st.bar_chart(data=subtabla, y='Potencia (kW)', x_label='Tiempo',
+                     y_label='Potencia instantánea generada (kW)', color=color, use_container_width=True)
 
-    # Lapsos de funcionamiento
-    lapsos_funcionamiento = (subtabla['Potencia (kW)'] > 0).sum()
-    # Lapsos de NO funcionamiento
-    lapsos_no_funcionamiento = (subtabla['Potencia (kW)'] == 0).sum()
+    totales = {campo: valor[0] for campo, valor in subresumen.totales().items()}
 
-    subtabla = subtabla.resample('D').mean()  # Calculo el promedio diario
+    # promedio diario, ya calculado en el resumen
+    subtabla = pd.DataFrame({'Potencia (kW)': subresumen.potencia_media()[0]},
+                            index=pd.DatetimeIndex(subresumen.dias))
+    subtabla = reducir(subtabla['Potencia (kW)'], puntos, metodo).to_frame()
 
     st.markdown(
         f"""
@@ -40,15 +170,15 @@ def plot_potencia(datos, fecha_inicio, fecha_fin, temporada, color):
         """,
         unsafe_allow_html=True
     )
-    st.bar_chart(data=subtabla, y='Potencia (kW)', x_label='Tiempo',
-                 y_label='Potencia media diaria (kW)', color=color, use_container_width=True)
+    with medidor.etapa(f'{temporada}: potencia media diaria'):
+        st.bar_chart(data=subtabla, y='Potencia (kW)', x_label='Tiempo',
+                     y_label='Potencia media diaria (kW)', color=color, use_container_width=True)
 
     # tiempo de funcionamiento, no funcionamiento en horas y total
-    # cada lapso es de 10 min
-    t_funcionamiento = (10/60) * lapsos_funcionamiento
-    t_no_funcionamiento = (10/60) * lapsos_no_funcionamiento
+    # cada lapso dura hasta la muestra siguiente; los huecos sin datos no cuentan
+    t_funcionamiento = totales['horas_funcionamiento']
+    t_no_funcionamiento = totales['horas_sin_funcionamiento']
     t_total = t_funcionamiento + t_no_funcionamiento
-    porcentajes = [t_funcionamiento/t_total, t_no_funcionamiento/t_total]
     etiqueta = ['Porcentaje de Horas de Funcionamiento',
                 'Porcentaje de Horas sin Funcionamiento']
 
@@ -63,16 +193,22 @@ def plot_potencia(datos, fecha_inicio, fecha_fin, temporada, color):
         """,
         unsafe_allow_html=True
     )
-    # Gráfico de torta
-    fig, ax = plt.subplots()
-    ax.pie(porcentajes, labels=etiqueta, autopct='%1.1f%%',
-           startangle=90, colors=[color, '#84917c'])
-    ax.axis('equal')
-    st.pyplot(fig)
+    # Gráfico de torta (una estación sin datos en la serie no tiene horas que repartir)
+    with medidor.etapa(f'{temporada}: torta'):
+        if t_total > 0:
+            st.image(torta([t_funcionamiento, t_no_funcionamiento], etiqueta, [color, '#84917c']),
+                     use_container_width=True)
+        else:
+            st.info(f'La serie no tiene datos de {temporada}.')
     st.divider()
 
 st.set_page_config(layout="centered")# Ajusta el contenido al centro de la pantalla
 
+# instrumentación opcional: apagada, medidor.etapa() no hace nada
+with st.sidebar:
+    depurar = st.toggle('Mostrar tiempos de ejecución (depuración)', False)
+medidor = Medidor(activo=depurar)
+
 # usamos al final tabs ya que la otra forma no dejaba guardar el archivo subido
 informacion, calculos, resultados = st.tabs(
     ["Información", "Cálculos", "Resultados"])
@@ -115,7 +251,7 @@ with informacion:
             unsafe_allow_html=True
         )
 
-        st.image("Esquema en bloques de un GFV.jpeg",
+        st.image(archivo_estatico("Esquema en bloques de un GFV.jpeg"),
                  caption="Esquema en bloques de un GFV")
 
     with st.container():
@@ -222,7 +358,7 @@ with informacion:
                 unsafe_allow_html=True
             )
         with animacion:
-            st.image('UTN.gif', use_container_width=True)
+            st.image(archivo_estatico('UTN.gif'), use_container_width=True)
 
         st.markdown(
             """
@@ -241,9 +377,13 @@ with informacion:
             unsafe_allow_html=True
         )
 
-        # si se desea saber más, se dispone un recuadro con la página de la facultad que habla del tema
-        components.iframe(
-            'https://www.frsf.utn.edu.ar/noticias/606-energia-limpia-y-ahorro-energetico-un-compromiso-para-la-utn-santa-fe', height=400, scrolling=True)
+        # si se desea saber más, se dispone un recuadro con la página de la facultad que habla del tema;
+        # se carga sólo si se pide, porque embebe un sitio externo completo en cada ejecución
+        nota_frsf = 'https://www.frsf.utn.edu.ar/noticias/606-energia-limpia-y-ahorro-energetico-un-compromiso-para-la-utn-santa-fe'
+        st.link_button('Nota de la FRSF sobre el GFV', nota_frsf)
+        if st.checkbox('Mostrar la nota en esta página'):
+            import streamlit.components.v1 as components
+            components.iframe(nota_frsf, height=400, scrolling=True)
 
 
 with calculos:
@@ -309,6 +449,10 @@ with calculos:
                              0.0044, max_value=-0.0044, value=-0.0044, format='%.4f')
         eta = st.number_input('Rendimiento global', min_value=0.97,
                               max_value=0.97, value=0.97, format='%.2f')
+        Pinv = st.number_input('Potencia nominal del inversor [kW]', min_value=2.5,
+                               max_value=2.5, value=2.5, format='%.2f')
+        mu = st.number_input('Umbral mínimo del inversor [%]', min_value=1.0,
+                             max_value=1.0, value=1.0, format='%.1f')
     else:
         N = st.number_input('Cantidad de paneles',
                             min_value=1, max_value=1000, value=12)
@@ -322,14 +466,54 @@ with calculos:
                              max_value=0.0, value=-0.0044, format='%.4f', step=0.001)
         eta = st.number_input('Rendimiento global', min_value=0.0,
                               max_value=1.0, value=0.97, format='%.2f', step=0.01)
+        Pinv = st.number_input('Potencia nominal del inversor [kW]', min_value=0.1,
+                               max_value=1000.0, value=2.5, format='%.2f', step=0.1)
+        mu = st.number_input('Umbral mínimo del inversor [%]', min_value=0.0,
+                             max_value=100.0, value=1.0, format='%.1f', step=0.5)
+
+    # con la NOCT (dato de hoja del panel) se usa la temperatura de celda en lugar de la ambiente
+    usar_NOCT = st.checkbox('Corregir la temperatura de celda con la NOCT', False)
+    if usar_NOCT:
+        if DatosUTN:
+            NOCT = st.number_input('NOCT del panel [°C]', min_value=45.0,
+                                   max_value=45.0, value=45.0, format='%.1f')
+        else:
+            NOCT = st.number_input('NOCT del panel [°C]', min_value=20.0,
+                                   max_value=80.0, value=45.0, format='%.1f', step=0.5)
+        st.markdown('$T_c = T + \\frac{NOCT - 20}{800} \\cdot G$')
+        Tc = temperatura_celda(G, T, NOCT)
+        st.write(f'**Temperatura de celda: {Tc:.1f} [°C]**')
+        st.caption('Si el archivo de Resultados trae una columna con la velocidad del viento [m/s] '
+                   '(con "viento" o "wind" en el nombre), la temperatura de celda se corrige también '
+                   'por viento.')
+    else:
+        NOCT = float('nan')
+        Tc = T
+
+    # rendimiento del inversor según su carga (ficha técnica) en lugar del eta constante
+    usar_curva = st.checkbox('Usar la curva de rendimiento del inversor en lugar de η constante', False)
+    curva_eta = None
+    if usar_curva:
+        st.write('Rendimiento según la carga del inversor $P/P_{inv}$; fuera de la tabla se usa el extremo.')
+        curva_editada = st.data_editor(
+            pd.DataFrame(CURVA_RENDIMIENTO_TIPICA, columns=['Carga (P/Pinv)', 'Rendimiento']),
+            num_rows='dynamic', disabled=DatosUTN)
+        try:
+            curva_eta = normalizar_curva(curva_editada.dropna().itertuples(index=False))
+        except ValueError as error:
+            st.error(f'{error}; se usa el rendimiento constante.')
 
     # el siguiente session_state quedó de unas pruebas intentando
+    # mu se guarda en por unidad, como lo usa el modelo
     st.session_state['inputs'] = {'Gstd': Gstd, 'Tr': Tr, 'N': N, 'Ppico': Ppico,
-                                  'G': G, 'T': T, 'kp': kp, 'eta': eta}
+                                  'G': G, 'T': T, 'kp': kp, 'eta': eta,
+                                  'Pinv': Pinv, 'mu': mu / 100, 'NOCT': NOCT,
+                                  'curva_eta': curva_eta}
 
-    P = N * Ppico * G / Gstd * (1 + kp * (T - Tr)) * eta * 1e-3
+    P, P_r = potencia_instantanea(G, T, st.session_state['inputs'])
 
     st.success(f'**Potencia obtenida: {P:.2f} kW**')
+    st.success(f'**Potencia entregada por el inversor: {P_r:.2f} kW**')
 
 
 with resultados:
@@ -344,10 +528,11 @@ with resultados:
         </div>
         <div style="text-align:justify;">
 
-        En este apartado usted podrá ingresar un archivo tipo .xlsx, cuyas columnas contengan
-        valores de *Nivel de Irradiancia* y *Temperatura*, para luego recibir una serie de 
-        gráficos obtenidos a raíz del análisis de los datos subidos y los parámetros
-        configurados en la sección Cálculos.
+        En este apartado usted podrá ingresar un archivo tipo .xlsx, .csv, .parquet o .feather,
+        cuyas columnas contengan valores de *Nivel de Irradiancia* y *Temperatura* (y, opcionalmente,
+        *Velocidad del viento* en m/s, en una columna con "viento" en el nombre), para luego
+        recibir una serie de gráficos obtenidos a raíz del análisis de los datos subidos y los
+        parámetros configurados en la sección Cálculos.
         
         </div>
         """,
@@ -358,42 +543,102 @@ with resultados:
         st.session_state['tabla'] = None
 
     archivo = st.file_uploader(
-        "Cargar archivo", type='xlsx', accept_multiple_files=False)
+        "Cargar archivo", type=list(FORMATOS), accept_multiple_files=False)
     if archivo:
         st.session_state['archivo'] = archivo
+        # la conversión se hace una sola vez; las lecturas siguientes mapean los .npy en memoria
+        convertir = st.checkbox('Convertir a formato columnar para acelerar futuras lecturas')
 
         if st.button("Recibir Resultados"):
             if 'archivo' in st.session_state:
                 archivo = st.session_state['archivo']
-                tabla = pd.read_excel(archivo, index_col=0)
-                nombre_G, nombre_T = tabla.columns
-
-                inputs = st.session_state['inputs']
-                tabla['Potencia (kW)'] = (
-                    inputs['N'] * inputs['Ppico'] *
-                    tabla[nombre_G] / inputs['Gstd']
-                    * (1 + inputs['kp'] * (tabla[nombre_T] - inputs['Tr'])) * inputs['eta'] * 1e-3
-                )
-                tabla['Energía (kWh)'] = tabla['Potencia (kW)']*10/60
-                st.session_state['tabla'] = tabla
+                cache = caches()
+
+                # el archivo se lee una sola vez por contenido; cambiar parámetros sólo recalcula
+                clave_archivo = hash_contenido(archivo.getvalue())
+                directorio = DIRECTORIO_COLUMNAR / clave_archivo
+
+                def leer_archivo():
+                    if es_columnar(directorio):
+                        return cargar_columnar(directorio)
+                    archivo.seek(0)
+                    tabla = leer_tabla(archivo)
+                    if convertir:
+                        convertir_a_columnar(tabla, directorio)
+                        return cargar_columnar(directorio)
+                    return tabla
+
+                with medidor.etapa('lectura del archivo'):
+                    tabla = cache['tablas'].obtener(clave_archivo, leer_archivo)
+
+                actualizar_resultados(clave_archivo, tabla, st.session_state['inputs'], medidor)
+
+        elif st.session_state.get('clave_resultados'):
+            # con resultados ya calculados, un cambio de parámetros se aplica sin volver a pulsar:
+            # sólo se recalcula lo que depende del parámetro que cambió
+            clave_archivo, clave_anterior = st.session_state['clave_resultados']
+            cache = caches()
+            if clave_anterior != clave_parametros(st.session_state['inputs']):
+                # otra sesión pudo desalojar la tabla: se vuelve a abrir si quedó convertida
+                directorio = DIRECTORIO_COLUMNAR / clave_archivo
+                if clave_archivo in cache['tablas'] or es_columnar(directorio):
+                    with medidor.etapa('lectura del archivo'):
+                        tabla = cache['tablas'].obtener(clave_archivo, lambda: cargar_columnar(directorio))
+                    actualizar_resultados(clave_archivo, tabla, st.session_state['inputs'], medidor)
+                else:
+                    st.warning('Los parámetros cambiaron: pulse "Recibir Resultados" para actualizar '
+                               'los resultados.')
+
+        # fuera del if/elif: los contadores se ven también en la ejecución que acaba de usar la caché
+        with st.sidebar:
+            with st.expander('Caché'):
+                for nombre, cache_nivel in caches().items():
+                    stats = cache_nivel.estadisticas()
+                    st.caption(f"**{nombre.capitalize()}**: {stats['aciertos']} aciertos, "
+                               f"{stats['fallos']} fallos, "
+                               f"{stats['entradas']}/{stats['capacidad']} entradas")
 
         if st.session_state['tabla'] is not None:
-            st.logo('UTN_FRSF_logo.jpg')
+            st.logo(archivo_estatico('UTN_FRSF_logo.jpg'))
             st.write('¡Su tabla ha sido cargada con éxito!')
-            st.dataframe(st.session_state['tabla'], use_container_width=True)
+            # la tabla se muestra por páginas para no enviar todas las filas al navegador
+            tabla = st.session_state['tabla']
+            columna_filas, columna_pagina = st.columns(2)
+            filas_pagina = columna_filas.selectbox('Filas por página', [100, 500, 1000, 5000], index=1)
+            paginas = max(1, -(-len(tabla) // filas_pagina))
+            pagina = columna_pagina.number_input(f'Página (de {paginas})', min_value=1,
+                                                 max_value=paginas, value=1)
+            with medidor.etapa('tabla completa'):
+                st.dataframe(tabla.iloc[(pagina - 1) * filas_pagina:pagina * filas_pagina],
+                             use_container_width=True)
             st.write('---')
 
+            resumen = st.session_state['resumen']
             # Selección de fecha
             with st.sidebar:
                 st.write('Seleccione las caracteristicas de su interes.')
+                # con datos de varios años se puede analizar uno solo o todo el período
+                anios = resumen.anios()
+                if len(anios) > 1:
+                    anio = st.selectbox('Año', ['Todos'] + anios)
+                    if anio != 'Todos':
+                        resumen = resumen.anio(anio)
+                # cantidad máxima de puntos que se envían por gráfico
+                with st.expander('Opciones de gráficos'):
+                    puntos = st.number_input('Puntos por gráfico', min_value=100,
+                                             max_value=10000, value=1500, step=100)
+                    metodo = st.selectbox('Método de reducción', METODOS,
+                                          format_func={'minmax': 'Mínimo y máximo',
+                                                       'lttb': 'LTTB'}.get)
                 diario = st.checkbox('Evolución Diaria')
             if diario is True:
                 st.header('Evolución Diaria')
+                primer_dia = resumen.dias[0].astype(datetime.date)
                 fecha = st.date_input(
                     "Seleccionar día",
-                    value=datetime.date(2019, 1, 1),
-                    min_value=datetime.date(2019, 1, 1),
-                    max_value=datetime.date(2019, 12, 31)
+                    value=primer_dia,
+                    min_value=primer_dia,
+                    max_value=resumen.dias[-1].astype(datetime.date)
                 )
                 # Filtrar tabla por fecha
                 st.markdown(
@@ -406,51 +651,60 @@ with resultados:
                         """,
                     unsafe_allow_html=True
                 )
-                subtabla = st.session_state['tabla'].loc[f'{fecha.year}-{fecha.month}-{fecha.day}', :]
-                st.line_chart(data=subtabla, y='Potencia (kW)',
-                              x_label='Tiempo', y_label='kW', use_container_width=True)
+                # el resumen diario da directamente las filas del día
+                tramo = resumen.tramo_dia(fecha)
+                if tramo is None:
+                    st.warning('No hay datos para el día seleccionado.')
+                else:
+                    subtabla = reducir(st.session_state['tabla']['Potencia (kW)'].iloc[tramo],
+                                       puntos, metodo).to_frame()
+                    with medidor.etapa('evolución diaria'):
+                        st.line_chart(data=subtabla, y='Potencia (kW)',
+                                      x_label='Tiempo', y_label='kW', use_container_width=True)
                 st.write('---')
             with st.sidebar:
                 anual = st.checkbox(
                     'Características Anuales de Funcionamiento')
             if anual is True:
-                # Energía
-                tabla_anual = st.session_state['tabla']
-                energia_anual = (tabla_anual['Energía (kWh)']).sum()
-                # Horas de funcionamiento
-                lapsos_funcionamiento_anual = (
-                    tabla_anual['Potencia (kW)'] > 0).sum()
-                lapsos_no_funcionamiento_anual = (
-                    tabla_anual['Potencia (kW)'] == 0).sum()
-                t_funcionamiento_anual = (lapsos_funcionamiento_anual)*10/60
-                t_no_funcionamiento_anual = (
-                    lapsos_no_funcionamiento_anual)*10/60
+                # Energía, a partir de las sumas diarias
+                totales = {campo: valor[0] for campo, valor in resumen.totales().items()}
+                energia_anual = totales['energia']
+                # Horas de funcionamiento, integradas sobre la duración real de cada lapso
+                t_funcionamiento_anual = totales['horas_funcionamiento']
+                t_no_funcionamiento_anual = totales['horas_sin_funcionamiento']
+                # horas del período, incluidas las que no tienen datos
+                t_periodo = totales['horas'] + totales['horas_sin_datos']
                 porcentajes_anual = [
                     t_funcionamiento_anual, t_no_funcionamiento_anual]
                 etiqueta = ['Porcentaje de Horas de Funcionamiento',
                             'Porcentaje de Horas sin Funcionamiento']
                 st.markdown(
                     f"""
-                        ##### Energía anual producida = {energia_anual: .1f} (kWh).
+                        ##### Energía producida en el período = {energia_anual: .1f} (kWh).
+                        ##### Energía recortada por el inversor = {totales['recortada']: .1f} (kWh).
+                        ##### Energía perdida por no superar el umbral = {totales['umbral']: .1f} (kWh).
                         <div style="text-align:center;">
 
                         ### Tiempo de funcionamiento anual
-                        De las 8760 horas del año, el generador produce energía 
+                        De las {t_periodo: .0f} horas del período, el generador produce energía 
                         durante {t_funcionamiento_anual: .0f} horas.
                         </div>
                         """,
                     unsafe_allow_html=True
                 )
-                fig, ax = plt.subplots()
-                ax.pie(
-                    porcentajes_anual,
-                    labels=etiqueta,
-                    autopct='%1.1f%%',
-                    startangle=90,
-                    colors=['#fff700', '#84917c']
-                )
-                ax.axis('equal')
-                st.pyplot(fig)
+                if totales['horas_sin_datos'] > 0:
+                    st.warning(f"La serie tiene {totales['horas_sin_datos']:.1f} horas sin datos, "
+                               "que no se contabilizan como funcionamiento ni como energía.")
+                if len(resumen.anios()) > 1:
+                    por_anio = resumen.por_anio()
+                    st.dataframe(pd.DataFrame({
+                        'Energía (kWh)': [valores['energia'][0] for valores in por_anio.values()],
+                        'Horas de funcionamiento': [valores['horas_funcionamiento'][0]
+                                                    for valores in por_anio.values()],
+                    }, index=list(por_anio)), use_container_width=True)
+                with medidor.etapa('torta anual'):
+                    st.image(torta(porcentajes_anual, etiqueta, ['#fff700', '#84917c']),
+                             use_container_width=True)
                 st.write('---')
 
             with st.sidebar:
@@ -466,30 +720,110 @@ with resultados:
                     ver = estaciones.checkbox("Verano", False)
                     oto = estaciones.checkbox("Otoño ", False)
                     invi = estaciones.checkbox("Invierno", False)
+                    hemisferio = st.radio('Hemisferio', HEMISFERIOS,
+                                          format_func=str.capitalize, horizontal=True)
                     st.write('---')
 
+                # las fechas de cada estación salen del resumen diario, para cada año y hemisferio
+                tabla = st.session_state['tabla']
+                clave = st.session_state.get('clave_resultados')
                 if prim is True:
-                    inicio_prim = '2019-09-21'
-                    fin_prim = '2019-12-20'
-                    plot_potencia(
-                        st.session_state['tabla'], inicio_prim, fin_prim, 'Primavera', color='#04d442')
+                    plot_potencia(tabla, resumen, 'Primavera', color='#04d442', hemisferio=hemisferio,
+                                  medidor=medidor, clave=clave, puntos=puntos, metodo=metodo)
 
                 if ver is True:
-                    subtabla_ver1 = st.session_state['tabla'].loc['2019-01-01':'2019-3-20', :]
-                    subtabla_ver2 = st.session_state['tabla'].loc['2019-12-21':'2019-12-31', :]
-                    subtabla_ver = pd.concat([subtabla_ver1, subtabla_ver2])
-                    inicio_ver = '2019-01-01'
-                    fin_ver = '2019-12-31'
-                    plot_potencia(subtabla_ver,inicio_ver, fin_ver, 'Verano', color='#f04507')
+                    plot_potencia(tabla, resumen, 'Verano', color='#f04507', hemisferio=hemisferio,
+                                  medidor=medidor, clave=clave, puntos=puntos, metodo=metodo)
 
                 if oto is True:
-                    inicio_otoño = '2019-03-21'
-                    fin_otoño = '2019-06-20'
-                    plot_potencia(
-                        st.session_state['tabla'], inicio_otoño, fin_otoño, 'Otoño', color='#b06e17')
+                    plot_potencia(tabla, resumen, 'Otoño', color='#b06e17', hemisferio=hemisferio,
+                                  medidor=medidor, clave=clave, puntos=puntos, metodo=metodo)
 
                 if invi is True:
-                    inicio_invierno = '2019-06-21'
-                    fin_invierno = '2019-09-20'
-                    plot_potencia(
-                        st.session_state['tabla'], inicio_invierno, fin_invierno, 'Invierno', color='#09a9e3')
+                    plot_potencia(tabla, resumen, 'Invierno', color='#09a9e3', hemisferio=hemisferio,
+                                  medidor=medidor, clave=clave, puntos=puntos, metodo=metodo)
+
+            with st.sidebar:
+                incierto = st.checkbox('Incertidumbre de la Energía Anual (P50/P90)')
+            if incierto is True:
+                st.header('Incertidumbre de la Energía Anual')
+                st.write('Se sortean η, kp, la pérdida por suciedad y el sesgo del piranómetro, y el año '
+                         'meteorológico de cada realización se arma con días de la serie.')
+                columna_a, columna_b, columna_c = st.columns(3)
+                realizaciones = columna_a.number_input('Realizaciones', min_value=100, max_value=100_000,
+                                                       value=10_000, step=1000)
+                remuestreo = columna_b.selectbox(
+                    'Año meteorológico', REMUESTREOS,
+                    format_func={'dias': 'Días sorteados del mismo mes', 'anios': 'Un año completo de la serie',
+                                 'ninguno': 'La serie tal cual'}.get)
+                desvio_eta = columna_c.number_input('Desvío de η', min_value=0.0, max_value=0.2,
+                                                    value=INCERTIDUMBRE_TIPICA['desvio_eta'], format='%.3f',
+                                                    step=0.005)
+                desvio_kp = columna_a.number_input('Desvío de kp', min_value=0.0, max_value=0.005,
+                                                   value=INCERTIDUMBRE_TIPICA['desvio_kp'], format='%.4f',
+                                                   step=0.0001)
+                suciedad = columna_b.number_input('Pérdida por suciedad [%]', min_value=0.0, max_value=50.0,
+                                                  value=100 * INCERTIDUMBRE_TIPICA['suciedad'], format='%.1f',
+                                                  step=0.5)
+                desvio_suciedad = columna_c.number_input(
+                    'Desvío de la suciedad [%]', min_value=0.0, max_value=20.0,
+                    value=100 * INCERTIDUMBRE_TIPICA['desvio_suciedad'], format='%.1f', step=0.5)
+                desvio_sesgo = columna_a.number_input(
+                    'Desvío del sesgo del piranómetro [%]', min_value=0.0, max_value=20.0,
+                    value=100 * INCERTIDUMBRE_TIPICA['desvio_sesgo_G'], format='%.1f', step=0.5)
+                # los porcentajes pasan a por unidad, como los usa el modelo
+                incertidumbre = {'desvio_eta': desvio_eta, 'desvio_kp': desvio_kp, 'suciedad': suciedad / 100,
+                                 'desvio_suciedad': desvio_suciedad / 100, 'desvio_sesgo_G': desvio_sesgo / 100}
+
+                # la tabla de resultados trae además potencia y energía: se usan sólo las columnas originales
+                datos = st.session_state['tabla'].drop(columns=['Potencia (kW)', 'Energía (kWh)'])
+                try:
+                    with medidor.etapa('incertidumbre'):
+                        resultado = simular_incertidumbre(st.session_state['clave_resultados'][0], datos,
+                                                          st.session_state['inputs'], int(realizaciones),
+                                                          remuestreo, incertidumbre)
+                except ValueError as error:
+                    st.error(f'No se pudo simular: {error}')
+                else:
+                    estadisticas = resultado.estadisticas()
+                    columna_50, columna_90, columna_99 = st.columns(3)
+                    columna_50.metric('P50', f"{estadisticas['P50 (kWh)']:.0f} kWh")
+                    columna_90.metric('P90', f"{estadisticas['P90 (kWh)']:.0f} kWh")
+                    columna_99.metric('P99', f"{estadisticas['P99 (kWh)']:.0f} kWh")
+                    st.caption('P90: energía anual que se supera en el 90 % de las realizaciones.')
+                    histograma = resultado.histograma()
+                    histograma.index = histograma.index.round(0)
+                    st.bar_chart(histograma, y='realizaciones', x_label='Energía anual (kWh)',
+                                 y_label='Realizaciones')
+                    st.dataframe(pd.Series(estadisticas, name='Energía anual').to_frame(),
+                                 use_container_width=True)
+                st.write('---')
+
+
+    # modo en vivo: en lugar de subir el archivo completo, se sigue uno local que se va completando
+    st.write('---')
+    if st.toggle('Modo en vivo: seguir un archivo o directorio local (.csv o .parquet) que el registrador va completando'):
+        ruta_vivo = st.text_input('Ruta del archivo o directorio')
+        columna_intervalo, columna_horas = st.columns(2)
+        intervalo = columna_intervalo.number_input('Actualizar cada [s]', min_value=2, max_value=600, value=10)
+        horas_vivo = columna_horas.number_input('Horas de potencia a mostrar', min_value=1,
+                                                max_value=168, value=24)
+        if ruta_vivo:
+            st.fragment(run_every=intervalo)(panel_vivo)(ruta_vivo, st.session_state['inputs'], horas_vivo)
+
+
+# panel de depuración: tiempos y memoria de las etapas de esta ejecución
+if depurar:
+    with st.sidebar:
+        st.write('---')
+        st.subheader('Tiempos de ejecución')
+        if medidor.registros:
+            st.dataframe(pd.DataFrame(medidor.registros).set_index('etapa'),
+                         use_container_width=True)
+            st.caption(f'Total medido: {medidor.total():.3f} s')
+            if st.session_state.get('recalculados') is not None:
+                st.caption('Series recalculadas: ' + (', '.join(st.session_state['recalculados']) or 'ninguna'))
+            st.download_button('Exportar como JSON', medidor.a_json(),
+                               file_name='tiempos_gfv.json', mime='application/json')
+        else:
+            st.caption('No hubo etapas medidas en esta ejecución.')
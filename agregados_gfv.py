@@ -0,0 +1,303 @@
+"""Acumuladores diarios de potencia y energía.
+
+Todas las estadísticas (anuales, estacionales y diarias) se derivan de sumas
+por día. Así el cálculo en memoria y el cálculo por bloques reducen cada día
+completo con las mismas operaciones y dan exactamente el mismo resultado.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from lectura_gfv import columna_viento, columnas_GT
+from modelo_gfv import armar_escenarios, integrar, limitar_potencia, potencia_escenarios
+
+ESTACIONES = ('Primavera', 'Verano', 'Otoño', 'Invierno')
+HEMISFERIOS = ('sur', 'norte')
+
+# un lapso más largo que FACTOR_HUECO pasos locales se considera un hueco sin datos
+FACTOR_HUECO = 1.5
+
+# lapsos a cada lado con cuya mediana se estima el paso local de muestreo
+VENTANA_PASO = 5
+
+_NS_POR_HORA = 3_600_000_000_000
+
+
+def _nanosegundos(indice):
+    return np.asarray(indice, dtype='datetime64[ns]').view(np.int64)
+
+
+def dias_locales(indice):
+    # día de cada muestra según la hora local: con zona horaria, np.asarray daría el día en UTC
+    if getattr(indice, 'tz', None) is not None:
+        indice = indice.tz_localize(None)
+    return np.asarray(indice, dtype='datetime64[D]')
+
+
+def inferir_paso(indice):
+    """Paso nominal de muestreo en horas: la mediana de las diferencias entre muestras."""
+    if len(indice) < 2:
+        raise ValueError('Se necesitan al menos dos muestras para inferir el paso de muestreo')
+    return float(np.median(np.diff(_nanosegundos(indice)))) / _NS_POR_HORA
+
+
+def duraciones_h(indice, paso_h, siguientes=None, anteriores=None):
+    """Horas que representa cada muestra y horas sin datos que la siguen.
+
+    Cada muestra vale hasta la siguiente. El paso local de cada lapso es la
+    mediana de los lapsos vecinos (VENTANA_PASO a cada lado, él incluido): un
+    lapso de más de FACTOR_HUECO pasos locales es un hueco, en el que la
+    muestra vale sólo el paso local y el resto se devuelve aparte, sin
+    energía asociada. Así un cambio en la frecuencia de muestreo del
+    registrador no se toma como hueco. La última muestra, si no se conoce la
+    que sigue, vale el paso local.
+
+    anteriores y siguientes son las fechas de las muestras que rodean a
+    indice, si se conocen (bastan VENTANA_PASO antes y VENTANA_PASO + 1
+    después): con ellas un tramo de la serie da lo mismo que la serie
+    completa. paso_h sólo se usa si no hay ningún lapso del que sacar el paso.
+    """
+    vacio = np.empty(0, dtype=np.int64)
+    previos = vacio if anteriores is None else _nanosegundos(anteriores)[-VENTANA_PASO:]
+    posteriores = vacio if siguientes is None else _nanosegundos(siguientes)[:VENTANA_PASO + 1]
+    propios = _nanosegundos(indice)
+    lapsos = np.diff(np.concatenate([previos, propios, posteriores])) / _NS_POR_HORA
+    if not len(posteriores):
+        # el lapso de la última muestra no se conoce
+        lapsos = np.append(lapsos, np.nan)
+    duracion = lapsos[len(previos):len(previos) + len(propios)].copy()
+
+    # la mediana de una ventana no es menor que el lapso más corto, así que sólo los lapsos de
+    # más de FACTOR_HUECO veces el más corto pueden ser huecos: en una serie regular, ninguno
+    conocidos = lapsos[~np.isnan(lapsos)]
+    candidatos = np.isnan(duracion)
+    if len(conocidos):
+        candidatos |= duracion > FACTOR_HUECO * conocidos.min()
+    posiciones = np.flatnonzero(candidatos)
+    if len(conocidos):
+        relleno = np.full(VENTANA_PASO, np.nan)
+        ventanas = sliding_window_view(np.concatenate([relleno, lapsos, relleno]), 2 * VENTANA_PASO + 1)
+        paso = np.nanmedian(ventanas[posiciones + len(previos)], axis=1)
+    else:
+        paso = np.full(len(posiciones), float(paso_h))
+
+    lapso = duracion[posiciones]
+    hueco = np.isnan(lapso) | (lapso > FACTOR_HUECO * paso)
+    posiciones, paso = posiciones[hueco], paso[hueco]
+    sin_datos = np.zeros(len(duracion))
+    sin_datos[posiciones] = np.nan_to_num(duracion[posiciones] - paso)
+    duracion[posiciones] = paso
+    return duracion, sin_datos
+
+
+def estacion_de(dias, hemisferio='sur'):
+    """Índice en ESTACIONES de cada día, para cualquier año y hemisferio."""
+    fechas = pd.DatetimeIndex(dias)
+    mes_dia = np.asarray(fechas.month * 100 + fechas.day)
+    codigos = np.select(
+        [(mes_dia >= 921) & (mes_dia <= 1220),
+         (mes_dia >= 1221) | (mes_dia <= 320),
+         (mes_dia >= 321) & (mes_dia <= 620)],
+        [0, 1, 2], default=3)
+    if hemisferio == 'norte':
+        # en el norte las estaciones están desfasadas medio año
+        codigos = (codigos + 2) % 4
+    elif hemisferio != 'sur':
+        raise ValueError(f'Hemisferio desconocido: {hemisferio}')
+    return codigos
+
+
+def sumar_dias(valor):
+    # suma cada escenario por separado: una reducción 2D sobre el último eje
+    # puede cambiar el orden de las sumas según cuántos escenarios haya
+    filas = valor.reshape(int(np.prod(valor.shape[:-1])), valor.shape[-1])
+    suma = np.array([fila.sum() for fila in filas])
+    return suma.reshape(valor.shape[:-1])
+
+
+class ResumenDiario:
+    """Sumas por día de cada escenario: cada campo es una matriz (escenarios x días).
+
+    Se arma una sola vez después del cálculo. Guarda además la fila donde
+    empieza cada día en la serie original, de modo que las consultas por
+    estación o mes se resuelven sobre los días y las de un día son un corte
+    directo de la tabla, sin volver a recorrerla.
+    """
+
+    CAMPOS = ('energia', 'recortada', 'umbral', 'suma_potencia', 'lapsos',
+              'lapsos_funcionamiento', 'lapsos_sin_funcionamiento', 'horas',
+              'horas_funcionamiento', 'horas_sin_funcionamiento', 'horas_sin_datos')
+
+    def __init__(self, dias, valores, inicio, paso_h):
+        self.dias = np.asarray(dias, dtype='datetime64[D]')
+        self.valores = valores
+        self.inicio = np.asarray(inicio, dtype=np.int64)
+        # paso nominal de muestreo (h); los huecos se miden contra el paso local (ver duraciones_h)
+        self.paso_h = paso_h
+        self._estaciones = {}
+
+    def __getitem__(self, campo):
+        return self.valores[campo]
+
+    def __len__(self):
+        return len(self.dias)
+
+    @classmethod
+    def concatenar(cls, partes):
+        partes = list(partes)
+        dias = np.concatenate([parte.dias for parte in partes])
+        valores = {campo: np.concatenate([parte[campo] for parte in partes], axis=-1)
+                   for campo in cls.CAMPOS}
+        inicio = np.concatenate([parte.inicio for parte in partes])
+        return cls(dias, valores, inicio, partes[0].paso_h)
+
+    @property
+    def lapsos_por_dia(self):
+        # la cantidad de lapsos es la misma para todos los escenarios
+        return self['lapsos'][(0,) * (self['lapsos'].ndim - 1)]
+
+    def estaciones(self, hemisferio='sur'):
+        if hemisferio not in self._estaciones:
+            self._estaciones[hemisferio] = estacion_de(self.dias, hemisferio)
+        return self._estaciones[hemisferio]
+
+    def anios(self):
+        return [int(anio) for anio in np.unique(self.dias.astype('datetime64[Y]').astype(int) + 1970)]
+
+    def seleccionar(self, mascara):
+        """Resumen restringido a los días marcados en mascara."""
+        resumen = ResumenDiario(self.dias[mascara],
+                                {campo: valor[..., mascara] for campo, valor in self.valores.items()},
+                                self.inicio[mascara], self.paso_h)
+        resumen._estaciones = {hemisferio: codigos[mascara]
+                               for hemisferio, codigos in self._estaciones.items()}
+        return resumen
+
+    def estacion(self, nombre, hemisferio='sur'):
+        return self.seleccionar(self.estaciones(hemisferio) == ESTACIONES.index(nombre))
+
+    def anio(self, anio):
+        return self.seleccionar(self.dias.astype('datetime64[Y]') == np.datetime64(f'{anio:04d}', 'Y'))
+
+    def mes(self, anio, mes):
+        return self.seleccionar(self.dias.astype('datetime64[M]') == np.datetime64(f'{anio:04d}-{mes:02d}'))
+
+    def tramo_dia(self, fecha):
+        """Corte de filas de la serie original para fecha, o None si no hay datos."""
+        fecha = np.datetime64(fecha, 'D')
+        posicion = np.searchsorted(self.dias, fecha)
+        if posicion == len(self) or self.dias[posicion] != fecha:
+            return None
+        inicio = self.inicio[posicion]
+        return slice(inicio, inicio + self.lapsos_por_dia[posicion])
+
+    def filas(self):
+        """Filas de la serie original que cubren estos días (un corte si son contiguas)."""
+        lapsos = self.lapsos_por_dia
+        if len(self) == 0:
+            return slice(0, 0)
+        if np.array_equal(self.inicio[1:], self.inicio[:-1] + lapsos[:-1]):
+            return slice(self.inicio[0], self.inicio[-1] + lapsos[-1])
+        # cada fila es su posición dentro de la selección más el corrimiento de su día
+        acumulado = np.cumsum(lapsos) - lapsos
+        return np.arange(lapsos.sum()) + np.repeat(self.inicio - acumulado, lapsos)
+
+    def potencia_media(self):
+        # promedio diario de la potencia instantánea, como resample('D').mean(): sin las muestras faltantes
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self['suma_potencia'] / (self['lapsos_funcionamiento'] + self['lapsos_sin_funcionamiento'])
+
+    def totales(self):
+        return {campo: sumar_dias(valor) for campo, valor in self.valores.items()}
+
+    def por_estacion(self, hemisferio='sur'):
+        return {nombre: self.estacion(nombre, hemisferio).totales() for nombre in ESTACIONES}
+
+    def por_anio(self):
+        return {anio: self.anio(anio).totales() for anio in self.anios()}
+
+
+def tramos_dias(indice, paso_h, faltante=None, siguientes=None, anteriores=None):
+    """Lo que del resumen diario depende sólo de las fechas y de los faltantes.
+
+    Devuelve (días, inicio de cada día, duración de cada muestra en horas,
+    horas sin datos tras cada muestra, faltante). faltante marca las muestras
+    sin G o T (None si no hay): su duración ya pasa a las horas sin datos.
+    Quien resume la misma serie con muchos escenarios puede calcularlo una
+    vez y pasarlo a reducir_dias. siguientes y anteriores, como en duraciones_h.
+    """
+    dias = dias_locales(indice)
+    inicio = np.flatnonzero(np.r_[True, dias[1:] != dias[:-1]])
+    duracion, sin_datos = duraciones_h(indice, paso_h, siguientes, anteriores)
+    if faltante is not None and faltante.any():
+        sin_datos += np.where(faltante, duracion, 0.0)
+        duracion[faltante] = 0.0
+    else:
+        faltante = None
+    return dias, inicio, duracion, sin_datos, faltante
+
+
+def reducir_dias(P, escenarios, tramos, paso_h, primera_fila=0):
+    """Limita P (escenarios x instantes) in situ y lo reduce por día.
+
+    tramos es el resultado de tramos_dias para la serie de P. Las muestras
+    faltantes no cuentan como funcionamiento ni como detención y su potencia
+    queda en 0. Devuelve (P_r, ResumenDiario).
+    """
+    dias, inicio, duracion, sin_datos, faltante = tramos
+    p = armar_escenarios(escenarios)
+    if faltante is not None:
+        P[..., faltante] = 0.0
+
+    Pr, recortada, umbral = limitar_potencia(P, p['Pinv'], p['mu'], duracion,
+                                             out=P, segmentos=inicio)
+    forma = Pr.shape[:-1] + inicio.shape
+    funcionando = Pr > 0
+    detenido = Pr == 0
+    if faltante is not None:
+        detenido &= ~faltante
+    valores = {
+        'energia': integrar(Pr, duracion, inicio),
+        'recortada': recortada,
+        'umbral': umbral,
+        'suma_potencia': np.add.reduceat(Pr, inicio, axis=-1),
+        'lapsos': np.broadcast_to(np.diff(np.r_[inicio, len(dias)]), forma),
+        'lapsos_funcionamiento': np.add.reduceat(funcionando, inicio, axis=-1, dtype=np.int64),
+        'lapsos_sin_funcionamiento': np.add.reduceat(detenido, inicio, axis=-1, dtype=np.int64),
+        'horas': np.broadcast_to(np.add.reduceat(duracion, inicio), forma),
+        'horas_funcionamiento': integrar(funcionando, duracion, inicio),
+        'horas_sin_funcionamiento': integrar(detenido, duracion, inicio),
+        'horas_sin_datos': np.broadcast_to(np.add.reduceat(sin_datos, inicio), forma),
+    }
+    return Pr, ResumenDiario(dias[inicio], valores, inicio + primera_fila, paso_h)
+
+
+def resumir_dias(indice, P, escenarios, paso_h=None, primera_fila=0, siguientes=None, anteriores=None):
+    """Limita P (escenarios x instantes) in situ y lo reduce por día.
+
+    indice debe estar ordenado para que cada día sea un tramo contiguo;
+    primera_fila es la posición de indice[0] dentro de la serie completa;
+    siguientes y anteriores, las fechas de las muestras que lo rodean, si
+    las hay (ver duraciones_h). paso_h es el paso nominal en horas, usado
+    si no hay lapsos de los que sacar el paso local; si no se indica se
+    infiere de indice.
+    Las muestras sin G o T (potencia NaN) se tratan como datos faltantes:
+    su potencia queda en 0, no cuentan como funcionamiento ni como detención
+    y su duración se suma a las horas sin datos, igual que un hueco.
+    Devuelve (P_r, ResumenDiario).
+    """
+    if paso_h is None:
+        paso_h = inferir_paso(indice)
+    # los faltantes vienen de los datos, así que son los mismos en todos los escenarios
+    faltante = np.isnan(P.reshape(-1, P.shape[-1])[0]) if P.size else None
+    tramos = tramos_dias(indice, paso_h, faltante, siguientes, anteriores)
+    return reducir_dias(P, escenarios, tramos, paso_h, primera_fila)
+
+
+def resumir_tabla(tabla, escenarios, paso_h=None, primera_fila=0, siguientes=None, anteriores=None):
+    """Potencia limitada y resumen diario de una tabla completa en memoria."""
+    nombre_G, nombre_T = columnas_GT(tabla)
+    nombre_V = columna_viento(tabla)
+    P = potencia_escenarios(tabla[nombre_G].to_numpy(), tabla[nombre_T].to_numpy(), escenarios,
+                            None if nombre_V is None else tabla[nombre_V].to_numpy())
+    return resumir_dias(tabla.index, P, escenarios, paso_h, primera_fila, siguientes, anteriores)
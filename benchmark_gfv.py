@@ -0,0 +1,223 @@
+"""Benchmark del camino de Resultados con series sintéticas.
+
+Genera series de G y T de distintos largos (de 1 día a 10 años con datos
+cada minuto), mide cada etapa del cálculo y compara contra una línea de
+base guardada. Termina con código 1 si alguna etapa empeora más de la
+tolerancia, para detectar regresiones al actualizar pandas o numpy.
+
+Ejemplos:
+    python benchmark_gfv.py                    # compara contra benchmark_base.json
+    python benchmark_gfv.py --guardar-base     # regenera la línea de base en esta máquina
+    python benchmark_gfv.py --tamanos 1d 1a --repeticiones 5
+    python benchmark_gfv.py --tamanos 1d --app  # incluye arranque y re-ejecución de la app
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agregados_gfv import ESTACIONES, duraciones_h, inferir_paso, resumir_dias
+from lectura_gfv import leer_tabla
+from modelo_gfv import PARAMETROS_UTN, armar_escenarios, limitar_potencia, potencia_escenarios
+
+# largo de cada serie en días
+TAMANOS = {'1d': 1, '1m': 30, '1a': 365, '10a': 3650}
+
+ARCHIVO_BASE = Path(__file__).with_name('benchmark_base.json')
+
+
+def serie_sintetica(dias, paso_min=1, inicio='2019-01-01', semilla=0):
+    """Serie de irradiancia (W/m2) y temperatura (°C) con ciclo diario y anual."""
+    rng = np.random.default_rng(semilla)
+    indice = pd.date_range(inicio, periods=dias * 24 * 60 // paso_min, freq=f'{paso_min}min')
+    hora = indice.hour.to_numpy() + indice.minute.to_numpy() / 60
+    dia_anio = indice.dayofyear.to_numpy()
+
+    # campana diaria entre las 6 y las 18, más alta en verano (hemisferio sur)
+    estacion = 0.75 + 0.25 * np.cos(2 * np.pi * dia_anio / 365)
+    sol = np.clip(np.sin(np.pi * (hora - 6) / 12), 0, None)
+    nubes = 1 - 0.6 * rng.random(len(indice)) ** 3
+    G = 1100 * estacion * sol * nubes
+    T = 18 + 8 * estacion + 6 * sol + rng.normal(0, 1, len(indice))
+    return pd.DataFrame({'Irradiancia (W/m²)': G, 'Temperatura (°C)': T}, index=indice)
+
+
+def _etapas(ruta):
+    # cada etapa recibe el estado de las anteriores y devuelve lo que agrega
+    escenarios = [PARAMETROS_UTN]
+    p = armar_escenarios(escenarios)
+
+    def carga(estado):
+        return {'tabla': leer_tabla(ruta)}
+
+    def modelo(estado):
+        tabla = estado['tabla']
+        return {'P': potencia_escenarios(tabla.iloc[:, 0].to_numpy(),
+                                         tabla.iloc[:, 1].to_numpy(), escenarios)}
+
+    def integracion(estado):
+        indice = estado['tabla'].index
+        duracion = duraciones_h(indice, inferir_paso(indice))[0]
+        limitar_potencia(estado['P'], p['Pinv'], p['mu'], duracion)
+        return {}
+
+    def resumen_diario(estado):
+        # resumir_dias limita in situ: se trabaja sobre una copia para no alterar P
+        Pr, resumen = resumir_dias(estado['tabla'].index, estado['P'].copy(), escenarios)
+        return {'Pr': Pr, 'resumen': resumen}
+
+    def estacional(estado):
+        resumen = estado['resumen']
+        resumen.por_estacion()
+        resumen.por_anio()
+        return {}
+
+    def graficos(estado):
+        # lo mismo que arma plot_potencia: filas de la estación y promedio diario
+        tabla = estado['tabla'].assign(**{'Potencia (kW)': estado['Pr'][0]})
+        for nombre in ESTACIONES:
+            subresumen = estado['resumen'].estacion(nombre)
+            tabla.iloc[subresumen.filas()]
+            pd.DataFrame({'Potencia (kW)': subresumen.potencia_media()[0]},
+                         index=pd.DatetimeIndex(subresumen.dias))
+        return {}
+
+    return [carga, modelo, integracion, resumen_diario, estacional, graficos]
+
+
+def medir(dias, repeticiones=3):
+    """Tiempo (mínimo de repeticiones), filas/s y memoria pico de cada etapa."""
+    serie = serie_sintetica(dias)
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = Path(directorio) / 'serie.parquet'
+        serie.to_parquet(ruta)
+        etapas = _etapas(ruta)
+
+        tiempos = {etapa.__name__: np.inf for etapa in etapas}
+        for _ in range(repeticiones):
+            estado = {}
+            for etapa in etapas:
+                inicio = time.perf_counter()
+                estado.update(etapa(estado))
+                tiempos[etapa.__name__] = min(tiempos[etapa.__name__], time.perf_counter() - inicio)
+
+        # la memoria se mide en una pasada aparte, porque tracemalloc hace más lento el cálculo
+        memoria = {}
+        estado = {}
+        tracemalloc.start()
+        for etapa in etapas:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            estado.update(etapa(estado))
+            memoria[etapa.__name__] = (tracemalloc.get_traced_memory()[1] - base) / 2**20
+        tracemalloc.stop()
+
+    filas = len(serie)
+    return {nombre: {'segundos': tiempos[nombre], 'filas/s': filas / tiempos[nombre],
+                     'memoria (MiB)': memoria[nombre]}
+            for nombre in tiempos}
+
+
+# se ejecuta en un intérprete nuevo, para que el arranque incluya los imports de la app
+_MEDICION_APP = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=300)
+inicio = time.perf_counter()
+app.run()
+arranque = time.perf_counter() - inicio
+reejecuciones = []
+for repeticion in range(int(sys.argv[2])):
+    inicio = time.perf_counter()
+    app.toggle[1].set_value(repeticion % 2 == 0).run()
+    reejecuciones.append(time.perf_counter() - inicio)
+print(json.dumps({'arranque': arranque, 'reejecucion': min(reejecuciones),
+                  'errores': [str(error.value) for error in app.exception]}))
+"""
+
+
+def medir_app(repeticiones=5):
+    """Arranque en frío de la app y re-ejecución al cambiar un control, sin datos cargados."""
+    directorio = Path(__file__).parent
+    app = directorio / 'Proyecto_Bauza_Gigliotti_v1.5.py'
+    salida = subprocess.run([sys.executable, '-c', _MEDICION_APP, str(app), str(max(1, repeticiones))],
+                            cwd=directorio, capture_output=True, text=True, check=True,
+                            env={**os.environ, 'PYTHONPATH': str(directorio)})
+    medida = json.loads(salida.stdout.strip().splitlines()[-1])
+    if medida['errores']:
+        raise RuntimeError('La app falló durante la medición: ' + '; '.join(medida['errores']))
+    return {etapa: {'segundos': medida[etapa]} for etapa in ('arranque', 'reejecucion')}
+
+
+def comparar(resultados, base, tolerancia):
+    """Lista de regresiones: etapas que superan la base en más de tolerancia (fracción)."""
+    regresiones = []
+    for tamano, etapas in resultados.items():
+        for etapa, medida in etapas.items():
+            referencia = base.get(tamano, {}).get(etapa)
+            if referencia is None:
+                continue
+            for magnitud in ('segundos', 'memoria (MiB)'):
+                if magnitud not in referencia or magnitud not in medida:
+                    continue
+                # margen absoluto mínimo para que el ruido en etapas muy cortas no cuente
+                limite = referencia[magnitud] * (1 + tolerancia) + (1e-3 if magnitud == 'segundos' else 1)
+                if medida[magnitud] > limite:
+                    regresiones.append(f'{tamano}/{etapa}: {magnitud} {medida[magnitud]:.4g} '
+                                       f'> {limite:.4g} (base {referencia[magnitud]:.4g})')
+    return regresiones
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Benchmark del simulador fotovoltaico.')
+    parser.add_argument('--tamanos', nargs='+', choices=list(TAMANOS), default=list(TAMANOS))
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--tolerancia', type=float, default=0.5,
+                        help='empeoramiento admitido respecto de la base, en fracción')
+    parser.add_argument('--base', type=Path, default=ARCHIVO_BASE)
+    parser.add_argument('--guardar-base', action='store_true',
+                        help='guarda las mediciones como nueva línea de base')
+    parser.add_argument('--app', action='store_true',
+                        help='mide además el arranque y la re-ejecución de la app de Streamlit')
+    args = parser.parse_args(argumentos)
+
+    resultados = {}
+    for tamano in args.tamanos:
+        resultados[tamano] = medir(TAMANOS[tamano], args.repeticiones)
+        tabla = pd.DataFrame(resultados[tamano]).T
+        print(f'\n{tamano} ({TAMANOS[tamano]} días, 1 min)')
+        print(tabla.to_string(float_format=lambda valor: f'{valor:.4g}'))
+    if args.app:
+        resultados['app'] = medir_app(args.repeticiones)
+        print('\napp (sin datos cargados)')
+        print(pd.DataFrame(resultados['app']).T.to_string(float_format=lambda valor: f'{valor:.4g}'))
+
+    if args.guardar_base:
+        base = json.loads(args.base.read_text()) if args.base.exists() else {}
+        base.update(resultados)
+        args.base.write_text(json.dumps(base, indent=2))
+        print(f'\nLínea de base guardada en {args.base}')
+        return 0
+
+    if not args.base.exists():
+        print(f'\nNo hay línea de base en {args.base}; generarla con --guardar-base')
+        return 0
+    regresiones = comparar(resultados, json.loads(args.base.read_text()), args.tolerancia)
+    if regresiones:
+        print('\nRegresiones:')
+        print('\n'.join(regresiones))
+        return 1
+    print('\nSin regresiones respecto de la línea de base.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
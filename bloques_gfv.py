@@ -0,0 +1,184 @@
+"""Procesamiento por bloques para series que no entran en memoria.
+
+Las series se leen de a bloques de filas y cada bloque pasa por el modelo.
+Sólo se conservan las sumas diarias, de modo que la memoria queda acotada
+por el tamaño del bloque (más, a lo sumo, un día pendiente) y no por el
+largo de la serie.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agregados_gfv import VENTANA_PASO, ResumenDiario, dias_locales, inferir_paso, resumir_tabla
+from lectura_gfv import cargar_columnar, es_columnar, extension, normalizar_tabla
+
+FILAS_POR_BLOQUE = 100_000
+
+
+def _bloques_tabla(tabla, filas):
+    for inicio in range(0, len(tabla), filas):
+        yield tabla.iloc[inicio:inicio + filas]
+
+
+def _tabla_excel(filas, encabezado):
+    # una celda vacía llega como None: sin convertir, un bloque sin datos quedaría con columnas object
+    return pd.DataFrame(filas, columns=encabezado).set_index(encabezado[0]).astype(float)
+
+
+def _bloques_excel(ruta, filas):
+    # openpyxl en modo sólo lectura recorre la hoja sin cargarla entera
+    import openpyxl
+
+    libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas_hoja = libro.active.iter_rows(values_only=True)
+        encabezado = next(filas_hoja)
+        buffer = []
+        for fila in filas_hoja:
+            buffer.append(fila)
+            if len(buffer) == filas:
+                yield _tabla_excel(buffer, encabezado)
+                buffer = []
+        if buffer:
+            yield _tabla_excel(buffer, encabezado)
+    finally:
+        libro.close()
+
+
+def _bloques_parquet(ruta, filas):
+    import pyarrow.parquet as pq
+
+    for lote in pq.ParquetFile(ruta).iter_batches(batch_size=filas):
+        yield lote.to_pandas()
+
+
+def _bloques_feather(ruta, filas):
+    import pyarrow as pa
+
+    with pa.memory_map(str(ruta)) as fuente:
+        lector = pa.ipc.open_file(fuente)
+        for posicion in range(lector.num_record_batches):
+            lote = lector.get_batch(posicion)
+            for inicio in range(0, lote.num_rows, filas):
+                yield lote.slice(inicio, filas).to_pandas()
+
+
+def leer_bloques(origen, filas=FILAS_POR_BLOQUE):
+    """Recorre origen de a bloques de hasta filas filas, con la fecha como índice.
+
+    origen puede ser un DataFrame, un directorio convertido a columnar o un
+    archivo .xlsx, .csv, .parquet o .feather.
+    """
+    if isinstance(origen, pd.DataFrame):
+        yield from _bloques_tabla(origen, filas)
+        return
+    if es_columnar(origen):
+        # los .npy están mapeados: cada bloque lee sólo sus páginas
+        yield from _bloques_tabla(cargar_columnar(origen), filas)
+        return
+
+    formato = extension(origen)
+    if formato == 'csv':
+        bloques = pd.read_csv(origen, index_col=0, parse_dates=True, chunksize=filas)
+    elif formato == 'xlsx':
+        bloques = _bloques_excel(origen, filas)
+    elif formato == 'parquet':
+        bloques = _bloques_parquet(origen, filas)
+    elif formato in ('feather', 'arrow'):
+        bloques = _bloques_feather(origen, filas)
+    else:
+        raise ValueError(f'Formato no soportado para lectura por bloques: {Path(origen).name}')
+    for bloque in bloques:
+        yield normalizar_tabla(bloque)
+
+
+class AcumuladorDiario:
+    """Resumen diario de una serie que llega de a bloques.
+
+    Sirve tanto para un archivo recorrido por partes como para datos que se
+    van agregando en vivo. El último día de cada bloque queda pendiente hasta
+    que llega un bloque de un día posterior, con al menos VENTANA_PASO + 1
+    muestras para estimar el paso local; así cada día se reduce completo y
+    el resultado coincide exactamente con resumir_tabla sobre la serie
+    entera. Si no se indica el paso nominal (h) se infiere del primer bloque
+    con al menos dos muestras; con un muestreo regular es el mismo que se
+    infiere de la serie completa.
+    """
+
+    def __init__(self, escenarios, paso_h=None, guardar_potencia=False):
+        self.escenarios = escenarios
+        self.paso_h = paso_h
+        self.partes = []
+        self.pendiente = None
+        # filas ya resumidas, para que el índice diario apunte a la serie completa
+        self.procesadas = 0
+        # (índice, potencia limitada) de cada tramo de días completos, si se pide guardarla
+        self.potencias = [] if guardar_potencia else None
+        # fechas de las últimas muestras resumidas, para el paso local del tramo siguiente
+        self._anteriores = None
+        self._completo = None
+
+    def agregar(self, bloque):
+        if self.pendiente is not None and not self.pendiente.empty:
+            bloque = pd.concat([self.pendiente, bloque])
+        if bloque.empty:
+            return
+        if self.paso_h is None:
+            if len(bloque) < 2:
+                self.pendiente = bloque
+                return
+            self.paso_h = inferir_paso(bloque.index)
+        # se corta al comienzo del último día que deja detrás las muestras suficientes
+        dias = dias_locales(bloque.index)
+        comienzos = np.flatnonzero(np.r_[True, dias[1:] != dias[:-1]])
+        comienzos = comienzos[len(bloque) - comienzos >= VENTANA_PASO + 1]
+        corte = comienzos[-1] if len(comienzos) else 0
+        self.pendiente = bloque.iloc[corte:]
+        if corte:
+            completo = bloque.iloc[:corte]
+            potencia, resumen = resumir_tabla(completo, self.escenarios, self.paso_h, self.procesadas,
+                                              siguientes=self.pendiente.index,
+                                              anteriores=self._anteriores)
+            self.partes.append(resumen)
+            if self.potencias is not None:
+                self.potencias.append((completo.index, potencia))
+            self.procesadas += len(completo)
+            self._anteriores = completo.index[-VENTANA_PASO:]
+
+    def resumir_pendiente(self):
+        """(potencia limitada, resumen) del día pendiente, provisorio hasta que se complete."""
+        if self.pendiente is None or not len(self.pendiente):
+            return None
+        paso_h = self.paso_h if self.paso_h is not None else inferir_paso(self.pendiente.index)
+        return resumir_tabla(self.pendiente, self.escenarios, paso_h, self.procesadas,
+                             anteriores=self._anteriores)
+
+    def resumen(self, pendiente=None):
+        """Resumen de todo lo recibido, con el día pendiente incluido.
+
+        pendiente es el resultado de resumir_pendiente(), si ya se calculó.
+        Los días completos se concatenan una sola vez por cada tramo nuevo.
+        """
+        if self._completo is None or self._completo[0] != len(self.partes):
+            self._completo = (len(self.partes),
+                              ResumenDiario.concatenar(self.partes) if self.partes else None)
+        completo = self._completo[1]
+        pendiente = pendiente if pendiente is not None else self.resumir_pendiente()
+        if pendiente is None:
+            return completo
+        if completo is None:
+            return pendiente[1]
+        return ResumenDiario.concatenar([completo, pendiente[1]])
+
+
+def procesar_por_bloques(bloques, escenarios, paso_h=None):
+    """Resumen diario de una serie recorrida por bloques (ver AcumuladorDiario)."""
+    acumulador = AcumuladorDiario(escenarios, paso_h)
+    for bloque in bloques:
+        acumulador.agregar(bloque)
+    return acumulador.resumen()
+
+
+def procesar_archivo(origen, escenarios, filas=FILAS_POR_BLOQUE, paso_h=None):
+    return procesar_por_bloques(leer_bloques(origen, filas), escenarios, paso_h)
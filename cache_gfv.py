@@ -0,0 +1,79 @@
+"""Caché LRU para las tablas leídas y los resultados calculados.
+
+Las tablas se identifican por el hash de su contenido y los resultados por
+(hash de la tabla, parámetros), así un cambio de parámetros no obliga a
+volver a leer el archivo.
+"""
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+
+from modelo_gfv import PARAMETROS, normalizar_curva
+
+
+def hash_contenido(datos):
+    # identifica un archivo por su contenido, no por su nombre
+    return hashlib.sha256(datos).hexdigest()
+
+
+def clave_parametros(inputs):
+    # sólo los parámetros del modelo: G y T de la pestaña Cálculos no afectan los resultados;
+    # los NaN (parámetro desactivado) se guardan como None para que la clave sea comparable
+    clave = tuple((nombre, None if math.isnan(float(inputs[nombre])) else float(inputs[nombre]))
+                  for nombre in PARAMETROS if nombre in inputs)
+    # la curva de rendimiento del inversor, si la hay, ya es una tupla de pares
+    return clave + (('curva_eta', normalizar_curva(inputs.get('curva_eta'))),)
+
+
+class CacheLRU:
+    """Diccionario de tamaño acotado que descarta lo usado hace más tiempo.
+
+    Se comparte entre las sesiones de la app, que corren en hilos distintos,
+    así que las operaciones sobre el diccionario van bajo un candado. calcular()
+    corre fuera de él para no frenar a los demás mientras tanto; si dos hilos
+    calculan la misma clave a la vez, queda el primer valor guardado.
+    """
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self.aciertos = 0
+        self.fallos = 0
+        self._datos = OrderedDict()
+        self._candado = threading.Lock()
+
+    def __contains__(self, clave):
+        with self._candado:
+            return clave in self._datos
+
+    def __len__(self):
+        with self._candado:
+            return len(self._datos)
+
+    def obtener(self, clave, calcular):
+        """Devuelve el valor guardado para clave o lo calcula con calcular()."""
+        with self._candado:
+            if clave in self._datos:
+                self.aciertos += 1
+                self._datos.move_to_end(clave)
+                return self._datos[clave]
+            self.fallos += 1
+
+        valor = calcular()
+        with self._candado:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                return self._datos[clave]
+            self._datos[clave] = valor
+            if len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+        return valor
+
+    def limpiar(self):
+        with self._candado:
+            self._datos.clear()
+
+    def estadisticas(self):
+        with self._candado:
+            return {'aciertos': self.aciertos, 'fallos': self.fallos,
+                    'entradas': len(self._datos), 'capacidad': self.capacidad}
@@ -0,0 +1,200 @@
+"""Modo flota: muchas plantas que comparten unas pocas estaciones meteorológicas.
+
+Cada planta es un escenario del modelo (N, Ppico, kp, eta, Pinv, mu, ...)
+más la estación de la que toma G y T. La serie de cada estación se lee una
+sola vez y todas sus plantas se calculan en una pasada, como una matriz
+plantas x instantes: la memoria crece con las potencias calculadas y no con
+copias de la tabla de entrada por planta.
+
+Ejemplo:
+    python flota_gfv.py flota.csv -o kpis.csv --serie-flota flota.parquet
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from agregados_gfv import HEMISFERIOS, resumir_tabla
+from lectura_gfv import FORMATOS, cargar_columnar, es_columnar, leer_registros, leer_tabla
+
+# columnas de los KPIs que se suman entre plantas para obtener los de la flota
+KPIS = {'energia': 'energia (kWh)', 'recortada': 'energia recortada (kWh)',
+        'umbral': 'energia bajo umbral (kWh)', 'horas_funcionamiento': 'horas de funcionamiento',
+        'horas_sin_datos': 'horas sin datos'}
+KPIS_SUMABLES = ('energia (kWh)', 'energia recortada (kWh)', 'energia bajo umbral (kWh)')
+
+
+def leer_flota(ruta):
+    """Plantas desde un .csv (una fila por planta) o un .json (lista de objetos).
+
+    Cada planta necesita 'planta' (nombre), 'estacion' y los parámetros del
+    modelo; las celdas vacías del .csv toman el valor estándar.
+    """
+    plantas = leer_registros(ruta)
+    for posicion, planta in enumerate(plantas):
+        planta.setdefault('planta', f'planta_{posicion}')
+        if 'estacion' not in planta:
+            raise ValueError(f'La planta {planta["planta"]} no indica su estación')
+        planta['estacion'] = str(planta['estacion'])
+    nombres = [planta['planta'] for planta in plantas]
+    if len(set(nombres)) != len(nombres):
+        raise ValueError('Hay plantas con el mismo nombre')
+    return plantas
+
+
+def buscar_estacion(estacion, directorio):
+    """Ruta de los datos de una estación: el nombre tal cual o con alguna extensión soportada."""
+    ruta = Path(directorio) / estacion
+    if ruta.exists():
+        return ruta
+    for formato in FORMATOS:
+        candidata = ruta.with_name(f'{ruta.name}.{formato}')
+        if candidata.exists():
+            return candidata
+    raise FileNotFoundError(f'No se encontraron datos para la estación {estacion} en {directorio}')
+
+
+def abrir_estacion(ruta):
+    # los directorios convertidos a columnar se abren mapeados, sin copiar
+    return cargar_columnar(ruta) if es_columnar(ruta) else leer_tabla(ruta)
+
+
+class ResultadoFlota:
+    """Series y resúmenes diarios de una flota, agrupados por estación.
+
+    Por cada estación se guarda el índice de su serie, la matriz de potencia
+    limitada de sus plantas (o nada, si no se pidieron series) y su
+    ResumenDiario; los KPIs salen de los resúmenes.
+    """
+
+    def __init__(self, plantas):
+        self.plantas = plantas
+        self.estaciones = {}
+        # planta -> (estación, fila dentro de la matriz de la estación)
+        self._ubicacion = {}
+
+    def agregar_estacion(self, estacion, indice, potencia, resumen, nombres):
+        self.estaciones[estacion] = {'indice': indice, 'potencia': potencia, 'resumen': resumen,
+                                     'plantas': nombres}
+        for fila, nombre in enumerate(nombres):
+            self._ubicacion[nombre] = (estacion, fila)
+
+    def potencia(self, planta):
+        """Serie de potencia entregada (kW) de una planta."""
+        estacion, fila = self._ubicacion[planta]
+        datos = self.estaciones[estacion]
+        if datos['potencia'] is None:
+            raise ValueError('La flota se simuló sin guardar las series de potencia')
+        return pd.Series(datos['potencia'][fila], index=datos['indice'], name=planta)
+
+    def potencia_flota(self):
+        """Serie de potencia total de la flota (kW), sobre la unión de los índices de las estaciones."""
+        totales = []
+        for estacion, datos in self.estaciones.items():
+            if datos['potencia'] is None:
+                raise ValueError('La flota se simuló sin guardar las series de potencia')
+            # la suma de cada estación es una serie: no se arma una tabla plantas x instantes
+            totales.append(pd.Series(datos['potencia'].sum(axis=0), index=datos['indice'], name=estacion))
+        if len(totales) == 1:
+            return totales[0].rename('flota')
+        return pd.concat(totales, axis=1).sum(axis=1, min_count=1).rename('flota')
+
+    def _filas_kpis(self, clave, obtener):
+        # obtener(resumen) devuelve {grupo: totales}; se llama una vez por estación
+        grupos = {estacion: obtener(datos['resumen']) for estacion, datos in self.estaciones.items()}
+        filas = []
+        # mismo orden que la definición de la flota, cualquiera sea el de las estaciones
+        for planta in self.plantas:
+            estacion, fila = self._ubicacion[planta['planta']]
+            for grupo, totales in grupos[estacion].items():
+                registro = {'planta': planta['planta'], 'estacion': estacion}
+                if clave:
+                    registro[clave] = grupo
+                registro.update({columna: totales[campo][fila] for campo, columna in KPIS.items()})
+                filas.append(registro)
+        return pd.DataFrame(filas).set_index(['planta', clave] if clave else 'planta')
+
+    def kpis(self):
+        """Totales de cada planta sobre todo el período."""
+        return self._filas_kpis(None, lambda resumen: {None: resumen.totales()})
+
+    def kpis_anuales(self):
+        return self._filas_kpis('anio', lambda resumen: resumen.por_anio())
+
+    def kpis_estacionales(self, hemisferio='sur'):
+        return self._filas_kpis('temporada', lambda resumen: resumen.por_estacion(hemisferio))
+
+    @staticmethod
+    def agregar(kpis):
+        """KPIs de la flota: suma de las energías de las plantas, por año o temporada si los hay."""
+        niveles = [nivel for nivel in kpis.index.names if nivel != 'planta']
+        if not niveles:
+            return kpis[list(KPIS_SUMABLES)].sum().to_frame().T
+        return kpis.groupby(level=niveles, sort=False)[list(KPIS_SUMABLES)].sum()
+
+
+def simular_flota(plantas, rutas=None, cargar=abrir_estacion, series=True):
+    """Simula todas las plantas, leyendo una vez la serie de cada estación.
+
+    rutas asocia cada estación con lo que recibe cargar (por defecto, su
+    nombre); cargar devuelve la tabla de la estación, así la app puede pasar
+    su caché de tablas. Con series=False sólo se guardan los resúmenes
+    diarios, para flotas largas en las que no interesan las series.
+    """
+    rutas = rutas or {}
+    resultado = ResultadoFlota(plantas)
+    por_estacion = {}
+    for planta in plantas:
+        por_estacion.setdefault(planta['estacion'], []).append(planta)
+
+    for estacion, grupo in por_estacion.items():
+        tabla = cargar(rutas.get(estacion, estacion))
+        # una sola pasada para todas las plantas de la estación: matriz plantas x instantes
+        potencia, resumen = resumir_tabla(tabla, grupo)
+        resultado.agregar_estacion(estacion, tabla.index, potencia if series else None, resumen,
+                                   [planta['planta'] for planta in grupo])
+        del tabla, potencia
+    return resultado
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Simulación de una flota de generadores fotovoltaicos.')
+    parser.add_argument('flota', help='archivo .csv o .json con una planta por fila')
+    parser.add_argument('--estaciones', type=Path, default=None,
+                        help='directorio con los datos de cada estación (por defecto, el de la flota)')
+    parser.add_argument('-o', '--salida', help='archivo .csv con los KPIs (por defecto, la salida estándar)')
+    parser.add_argument('--agrupar', choices=('total', 'anio', 'estacion'), default='total',
+                        help='período de los KPIs: todo, por año o por temporada')
+    parser.add_argument('--hemisferio', choices=HEMISFERIOS, default='sur')
+    parser.add_argument('--serie-flota', type=Path, default=None,
+                        help='archivo .parquet o .csv donde guardar la potencia total de la flota')
+    args = parser.parse_args(argumentos)
+
+    plantas = leer_flota(args.flota)
+    directorio = args.estaciones or Path(args.flota).parent
+    rutas = {planta['estacion']: buscar_estacion(planta['estacion'], directorio) for planta in plantas}
+    resultado = simular_flota(plantas, rutas, series=args.serie_flota is not None)
+
+    if args.agrupar == 'anio':
+        kpis = resultado.kpis_anuales()
+    elif args.agrupar == 'estacion':
+        kpis = resultado.kpis_estacionales(args.hemisferio)
+    else:
+        kpis = resultado.kpis()
+    # las filas de la flota van al final, con planta = 'flota'
+    flota = ResultadoFlota.agregar(kpis)
+    flota = flota.reset_index(drop=flota.index.names == [None]).assign(planta='flota')
+    salida = pd.concat([kpis.reset_index(), flota], ignore_index=True)
+    salida.to_csv(args.salida if args.salida else sys.stdout, index=False)
+
+    if args.serie_flota is not None:
+        serie = resultado.potencia_flota().to_frame('Potencia (kW)')
+        if args.serie_flota.suffix.lower() == '.csv':
+            serie.to_csv(args.serie_flota)
+        else:
+            serie.to_parquet(args.serie_flota)
+
+
+if __name__ == '__main__':
+    main()
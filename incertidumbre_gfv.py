@@ -0,0 +1,365 @@
+"""Incertidumbre de la energía anual por Monte Carlo: P50, P90 y su distribución.
+
+Cada realización sortea los parámetros inciertos (η, kp, pérdida por
+suciedad y sesgo del piranómetro) y un año meteorológico armado con días
+de la serie. Las realizaciones son escenarios del modelo: se evalúan de a
+bloques como una matriz realizaciones x instantes, con la memoria acotada
+por MEMORIA_BLOQUE, y los bloques pueden repartirse entre procesos.
+
+La suciedad y el sesgo sólo escalan la irradiancia, así que se pliegan en
+los parámetros del escenario: la irradiancia real es G (1 + sesgo), la que
+llega a las celdas G (1 + sesgo) (1 - suciedad), y la NOCT se corrige para
+que el calentamiento use la irradiancia real.
+
+Sin inversor que recorte (P_inv infinita) ni curva de rendimiento, la
+energía de un día es lineal en tres sumas diarias de la serie y cada
+realización se resuelve con unas pocas operaciones por día, sin pasar por
+la matriz de potencias.
+
+Ejemplo:
+    python incertidumbre_gfv.py datos.parquet -n 10000 -e escenario.json --histograma hist.csv
+"""
+import argparse
+import json
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agregados_gfv import dias_locales, duraciones_h, inferir_paso
+from lectura_gfv import cargar_columnar, columna_viento, columnas_GT, es_columnar, leer_tabla
+from modelo_gfv import (G_NOCT, PARAMETROS_UTN, T_NOCT, VALORES_ESTANDAR, armar_escenarios, factor_viento,
+                        normalizar_curva, potencia_escenarios)
+
+# desvíos estándar de los parámetros inciertos (η y kp absolutos, el sesgo en por unidad)
+# y pérdida por suciedad media con su desvío, en por unidad
+INCERTIDUMBRE_TIPICA = {'desvio_eta': 0.01, 'desvio_kp': 0.0005, 'suciedad': 0.02,
+                        'desvio_suciedad': 0.01, 'desvio_sesgo_G': 0.03}
+
+# año meteorológico de cada realización: días sorteados del mismo mes, un año completo
+# de la serie o la serie tal cual (llevada a 365 días)
+REMUESTREOS = ('dias', 'anios', 'ninguno')
+
+# probabilidades de excedencia que se informan (P90: la energía se supera en el 90 % de los casos)
+EXCEDENCIAS = (50, 75, 90, 99)
+
+# memoria de la matriz de potencias de cada bloque de realizaciones; bloques más grandes
+# no ganan nada y, por encima de unas decenas de MiB, cada bloque pide memoria nueva y es
+# más lento (10 000 realizaciones de un año cada 10 min: ~1 s con 32 MiB, ~2,6 s con 128 MiB)
+MEMORIA_BLOQUE = 32 * 2 ** 20
+
+# mes de cada día de un año de 365 días
+_MES_DEL_DIA = (np.arange('2001-01-01', '2002-01-01', dtype='datetime64[D]').astype('datetime64[M]')
+                .astype(int) % 12)
+
+
+def muestrear(inputs, realizaciones, incertidumbre=None, semilla=None):
+    """Parámetros inciertos de cada realización, como arreglos de largo realizaciones.
+
+    Todos se sortean de normales independientes; η y la suciedad se recortan
+    a [0, 1]. Con curva_eta el η sorteado no se usa: el rendimiento lo da la curva.
+    """
+    incertidumbre = {**INCERTIDUMBRE_TIPICA, **(incertidumbre or {})}
+    rng = np.random.default_rng(semilla)
+    return {
+        'eta': np.clip(rng.normal(inputs['eta'], incertidumbre['desvio_eta'], realizaciones), 0, 1),
+        'kp': rng.normal(inputs['kp'], incertidumbre['desvio_kp'], realizaciones),
+        'suciedad': np.clip(rng.normal(incertidumbre['suciedad'], incertidumbre['desvio_suciedad'],
+                                       realizaciones), 0, 1),
+        'sesgo_G': rng.normal(0.0, incertidumbre['desvio_sesgo_G'], realizaciones),
+    }
+
+
+def escenarios_realizaciones(inputs, muestras):
+    """Escenarios del modelo (diccionario de arreglos) equivalentes a cada realización."""
+    escenarios = {clave: inputs.get(clave, VALORES_ESTANDAR.get(clave))
+                  for clave in ('N', 'Gstd', 'Tr', 'Pinv', 'mu', 'NOCT')}
+    escenarios['curva_eta'] = normalizar_curva(inputs.get('curva_eta'))
+    escenarios['eta'] = muestras['eta']
+    escenarios['kp'] = muestras['kp']
+    escenarios['Ppico'] = inputs['Ppico'] * (1 + muestras['sesgo_G']) * (1 - muestras['suciedad'])
+    # sin NOCT (NaN) el resultado sigue siendo NaN
+    escenarios['NOCT'] = T_NOCT + (float(escenarios['NOCT']) - T_NOCT) * (1 + muestras['sesgo_G'])
+    return escenarios
+
+
+def _elegir(escenarios, desde, hasta):
+    # las realizaciones desde:hasta de un diccionario de escenarios
+    return {clave: valor[desde:hasta] if isinstance(valor, np.ndarray) and valor.ndim else valor
+            for clave, valor in escenarios.items()}
+
+
+class AnalisisIncertidumbre:
+    """Energía anual de muchas realizaciones sobre una tabla de G, T (y viento).
+
+    Sólo se usan los días completos (24 h sin huecos ni faltantes), y de
+    ellos sólo las filas con irradiancia no nula: las demás no aportan
+    energía con ningún parámetro. Se crea una vez por tabla.
+    """
+
+    def __init__(self, tabla, paso_h=None):
+        nombre_G, nombre_T = columnas_GT(tabla)
+        nombre_V = columna_viento(tabla)
+        G = tabla[nombre_G].to_numpy(dtype=float)
+        T = tabla[nombre_T].to_numpy(dtype=float)
+        self.paso_h = inferir_paso(tabla.index) if paso_h is None else paso_h
+
+        dias = dias_locales(tabla.index)
+        inicio = np.flatnonzero(np.r_[True, dias[1:] != dias[:-1]])
+        duracion, sin_datos = duraciones_h(tabla.index, self.paso_h)
+        horas = np.add.reduceat(duracion, inicio)
+        faltantes = np.add.reduceat(np.isnan(G) | np.isnan(T), inicio)
+        completos = ((np.abs(horas - 24) <= self.paso_h / 2) & (np.add.reduceat(sin_datos, inicio) == 0)
+                     & (faltantes == 0))
+        self.dias = dias[inicio][completos]
+        if not len(self.dias):
+            raise ValueError('La serie no tiene ningún día completo')
+
+        # número de día completo de cada fila (-1 en los demás días) y filas que se conservan
+        numero = np.full(len(inicio), -1)
+        numero[completos] = np.arange(completos.sum())
+        dia_fila = np.repeat(numero, np.diff(np.r_[inicio, len(dias)]))
+        filas = (dia_fila >= 0) & (G != 0)
+        self.G = G[filas]
+        self.T = T[filas]
+        self.duracion = duracion[filas]
+        self.dia_fila = dia_fila[filas]
+        self.V = None if nombre_V is None else tabla[nombre_V].to_numpy(dtype=float)[filas]
+        # calentamiento de la celda por unidad de coeficiente NOCT, con la corrección por viento
+        self.calentamiento = self.G * factor_viento(self.V)
+
+        # comienzo de cada día dentro de las filas conservadas; los días sin sol no tienen filas
+        self.inicio = np.searchsorted(self.dia_fila, np.arange(len(self.dias)))
+        self.sin_filas = np.bincount(self.dia_fila, minlength=len(self.dias)) == 0
+        self._momentos = None
+
+    def momentos(self):
+        """Sumas diarias de G dt, G T dt y G calentamiento dt sobre las filas con G > 0."""
+        if self._momentos is None:
+            sol = self.G > 0
+            ponderada = self.G[sol] * self.duracion[sol]
+            self._momentos = tuple(
+                np.bincount(self.dia_fila[sol], weights=ponderada * factor, minlength=len(self.dias))
+                for factor in (1.0, self.T[sol], self.calentamiento[sol]))
+        return self._momentos
+
+    def es_lineal(self, escenarios):
+        """True si ninguna realización recorta ni anula potencia y vale la forma cerrada.
+
+        Hace falta que no haya inversor que limite (P_inv infinita, y entonces
+        tampoco umbral), ni curva de rendimiento, y que el factor de temperatura
+        sea positivo en toda la serie, así la potencia es positiva justo donde G lo es.
+        """
+        p = armar_escenarios(escenarios)
+        if escenarios.get('curva_eta') is not None or np.isfinite(p['Pinv']).any():
+            return False
+        if (p['N'] * p['Ppico'] * p['eta'] / p['Gstd'] < 0).any():
+            return False
+        sol = self.G > 0
+        if not sol.any():
+            return True
+        coeficiente = np.nan_to_num((p['NOCT'] - T_NOCT) / G_NOCT)
+        calentamiento = self.calentamiento[sol]
+        # cotas de la temperatura de celda de cada realización
+        extremos = coeficiente[:, None] * [calentamiento.min(), calentamiento.max()]
+        Tc_max = self.T[sol].max() + extremos.max(axis=1)
+        Tc_min = self.T[sol].min() + extremos.min(axis=1)
+        factor = 1 + np.minimum(p['kp'] * (Tc_max - p['Tr']), p['kp'] * (Tc_min - p['Tr']))
+        return bool((factor > 0).all())
+
+    def energias_diarias(self, escenarios, lineal=False):
+        """Energía (kWh) de cada realización en cada día completo: matriz realizaciones x días."""
+        p = armar_escenarios(escenarios)
+        if lineal:
+            # E = escala [(1 - kp Tr) ΣG dt + kp ΣG T dt + kp coef ΣG calentamiento dt]
+            suma_G, suma_GT, suma_GC = self.momentos()
+            escala = (p['N'] * p['Ppico'] * p['eta'] * 1e-3 / p['Gstd'])[:, None]
+            coeficiente = np.nan_to_num((p['NOCT'] - T_NOCT) / G_NOCT)[:, None]
+            kp = p['kp'][:, None]
+            return escala * ((1 - kp * p['Tr'][:, None]) * suma_G + kp * (suma_GT + coeficiente * suma_GC))
+
+        if not len(self.G):
+            return np.zeros((len(p['N']), len(self.dias)))
+        P = potencia_escenarios(self.G, self.T, escenarios, self.V)
+        # el límite de limitar_potencia, sin las energías recortada y bajo umbral que acá no se usan
+        Pinv = p['Pinv'][:, None]
+        with np.errstate(invalid='ignore'):
+            Pmin = np.nan_to_num(p['mu'][:, None] * Pinv, nan=0.0, posinf=0.0)
+        bajo_umbral = P <= Pmin
+        np.minimum(P, Pinv, out=P)
+        np.copyto(P, 0.0, where=bajo_umbral)
+        del bajo_umbral
+        P *= self.duracion
+        # sólo se reduce en los días con filas: un comienzo repetido cortaría el día anterior
+        diarias = np.zeros((len(P), len(self.dias)))
+        con_filas = ~self.sin_filas
+        diarias[:, con_filas] = np.add.reduceat(P, self.inicio[con_filas], axis=1)
+        return diarias
+
+    def sortear_anios(self, realizaciones, remuestreo='dias', semilla=None):
+        """Qué días forman el año de cada realización.
+
+        Con 'dias' devuelve una matriz realizaciones x 365 de posiciones de días,
+        cada una sorteada entre los días completos del mismo mes; con 'anios',
+        una matriz de pertenencia días x años completos y el año de cada
+        realización; con 'ninguno', None.
+        """
+        rng = np.random.default_rng(semilla)
+        if remuestreo == 'dias':
+            mes = self.dias.astype('datetime64[M]').astype(int) % 12
+            orden = np.argsort(mes, kind='stable')
+            cantidad = np.bincount(mes, minlength=12)
+            if (cantidad == 0).any():
+                faltan = ', '.join(str(numero + 1) for numero in np.flatnonzero(cantidad == 0))
+                raise ValueError(f'No hay días completos de los meses {faltan} para armar el año')
+            comienzo = np.cumsum(cantidad) - cantidad
+            sorteo = rng.integers(0, cantidad[_MES_DEL_DIA], size=(realizaciones, len(_MES_DEL_DIA)))
+            return orden[comienzo[_MES_DEL_DIA] + sorteo]
+        if remuestreo == 'anios':
+            anio = self.dias.astype('datetime64[Y]').astype(int) + 1970
+            anios, cuenta = np.unique(anio, return_counts=True)
+            anios = anios[cuenta >= 365]
+            if not len(anios):
+                raise ValueError('La serie no tiene ningún año con todos sus días completos')
+            pertenencia = (anio[:, None] == anios).astype(float)
+            return pertenencia, rng.integers(0, len(anios), size=realizaciones)
+        if remuestreo == 'ninguno':
+            return None
+        raise ValueError(f'Remuestreo desconocido: {remuestreo}')
+
+    def energia_anual(self, diarias, remuestreo, anios):
+        # anios es lo que devolvió sortear_anios, ya cortado a las realizaciones de diarias
+        if remuestreo == 'dias':
+            return np.take_along_axis(diarias, anios, axis=1).sum(axis=1)
+        if remuestreo == 'anios':
+            pertenencia, elegido = anios
+            return np.take_along_axis(diarias @ pertenencia, elegido[:, None], axis=1)[:, 0]
+        return diarias.sum(axis=1) * 365 / len(self.dias)
+
+    def realizaciones_por_bloque(self, memoria=MEMORIA_BLOQUE):
+        return max(1, memoria // (8 * max(1, len(self.G))))
+
+    def simular(self, inputs, realizaciones=10_000, incertidumbre=None, remuestreo='dias', semilla=None,
+                trabajadores=1, memoria=MEMORIA_BLOQUE):
+        """ResultadoIncertidumbre de realizaciones sorteos alrededor del escenario inputs.
+
+        Con la misma semilla el resultado no depende del tamaño de bloque ni
+        de la cantidad de procesos: todo se sortea antes de repartir.
+        """
+        semillas = np.random.SeedSequence(semilla).spawn(2)
+        muestras = muestrear(inputs, realizaciones, incertidumbre, semillas[0])
+        escenarios = escenarios_realizaciones(inputs, muestras)
+        anios = self.sortear_anios(realizaciones, remuestreo, semillas[1])
+        lineal = self.es_lineal(escenarios)
+
+        # la forma cerrada sólo arma matrices realizaciones x días: no hace falta repartirla
+        por_bloque = realizaciones if lineal else self.realizaciones_por_bloque(memoria)
+        tareas = [(_elegir(escenarios, desde, desde + por_bloque), remuestreo,
+                   _cortar_anios(anios, remuestreo, desde, desde + por_bloque), lineal)
+                  for desde in range(0, realizaciones, por_bloque)]
+        if trabajadores > 1 and len(tareas) > 1:
+            with ProcessPoolExecutor(min(trabajadores, len(tareas)), initializer=_iniciar_proceso,
+                                     initargs=(self,)) as ejecutor:
+                partes = list(ejecutor.map(_calcular_bloque, tareas))
+        else:
+            partes = [self._calcular_bloque(*tarea) for tarea in tareas]
+        return ResultadoIncertidumbre(np.concatenate(partes), muestras, remuestreo, lineal)
+
+    def _calcular_bloque(self, escenarios, remuestreo, anios, lineal):
+        return self.energia_anual(self.energias_diarias(escenarios, lineal), remuestreo, anios)
+
+
+def _cortar_anios(anios, remuestreo, desde, hasta):
+    if remuestreo == 'dias':
+        return anios[desde:hasta]
+    if remuestreo == 'anios':
+        return anios[0], anios[1][desde:hasta]
+    return None
+
+
+# en cada proceso hijo el análisis (la serie ya preparada) se recibe una sola vez
+_ANALISIS = None
+
+
+def _iniciar_proceso(analisis):
+    global _ANALISIS
+    _ANALISIS = analisis
+
+
+def _calcular_bloque(tarea):
+    return _ANALISIS._calcular_bloque(*tarea)
+
+
+class ResultadoIncertidumbre:
+    """Energía anual (kWh) de cada realización y los parámetros sorteados."""
+
+    def __init__(self, energia, muestras, remuestreo, lineal):
+        self.energia = energia
+        self.muestras = muestras
+        self.remuestreo = remuestreo
+        # si se resolvió con la forma cerrada, sin la matriz de potencias
+        self.lineal = lineal
+
+    def __len__(self):
+        return len(self.energia)
+
+    def excedencia(self, probabilidad):
+        """Energía que se supera con la probabilidad dada en %: excedencia(90) es el P90."""
+        return float(np.percentile(self.energia, 100 - probabilidad))
+
+    def estadisticas(self):
+        estadisticas = {'media (kWh)': float(self.energia.mean()),
+                        'desvío (kWh)': float(self.energia.std(ddof=1)) if len(self) > 1 else 0.0}
+        estadisticas.update({f'P{probabilidad} (kWh)': self.excedencia(probabilidad)
+                             for probabilidad in EXCEDENCIAS})
+        estadisticas.update({'mínimo (kWh)': float(self.energia.min()),
+                             'máximo (kWh)': float(self.energia.max())})
+        return estadisticas
+
+    def histograma(self, intervalos=50):
+        """Cantidad de realizaciones por intervalo de energía, indexada por el centro del intervalo."""
+        conteos, bordes = np.histogram(self.energia, bins=intervalos)
+        return pd.DataFrame({'desde (kWh)': bordes[:-1], 'hasta (kWh)': bordes[1:], 'realizaciones': conteos},
+                            index=pd.Index((bordes[:-1] + bordes[1:]) / 2, name='energía (kWh)'))
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='P50/P90 de la energía anual de un GFV por Monte Carlo.')
+    parser.add_argument('datos', help='archivo de G y T (o directorio columnar)')
+    parser.add_argument('-e', '--escenario', help='archivo .json con los parámetros (por defecto, el GFV de la UTN)')
+    parser.add_argument('-n', '--realizaciones', type=int, default=10_000)
+    parser.add_argument('--remuestreo', choices=REMUESTREOS, default='dias',
+                        help='cómo se arma el año meteorológico de cada realización')
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('-j', '--trabajadores', type=int, default=1, help='procesos para la forma general')
+    for clave, valor in INCERTIDUMBRE_TIPICA.items():
+        parser.add_argument(f'--{clave.replace("_", "-")}', dest=clave, type=float, default=valor)
+    parser.add_argument('--histograma', type=Path, default=None, help='archivo .csv donde guardar el histograma')
+    parser.add_argument('--intervalos', type=int, default=50)
+    args = parser.parse_args(argumentos)
+
+    inputs = dict(PARAMETROS_UTN)
+    if args.escenario:
+        with open(args.escenario, encoding='utf-8') as archivo:
+            inputs.update(json.load(archivo))
+    tabla = cargar_columnar(args.datos) if es_columnar(args.datos) else leer_tabla(args.datos)
+    analisis = AnalisisIncertidumbre(tabla)
+    del tabla
+    resultado = analisis.simular(inputs, args.realizaciones,
+                                 {clave: getattr(args, clave) for clave in INCERTIDUMBRE_TIPICA},
+                                 args.remuestreo, args.semilla, args.trabajadores)
+
+    print(f'{len(resultado)} realizaciones sobre {len(analisis.dias)} días completos '
+          f'({"forma cerrada" if resultado.lineal else "matriz de potencias"})')
+    for nombre, valor in resultado.estadisticas().items():
+        print(f'{nombre:>16} {valor:12.1f}')
+    if args.histograma is not None:
+        resultado.histograma(args.intervalos).to_csv(args.histograma)
+    return 0 if math.isfinite(resultado.energia.sum()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
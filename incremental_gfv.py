@@ -0,0 +1,147 @@
+"""Recálculo incremental de los resultados de una tabla al cambiar parámetros.
+
+La potencia de un escenario se arma como una cadena de magnitudes derivadas
+(temperatura de celda, factor de temperatura, factor de irradiancia,
+potencia por unidad, potencia bruta, potencia del inversor y, al final,
+potencia limitada, energía y resumen diario). Cada una recuerda los
+parámetros con que se calculó: al cambiar uno sólo se recalculan las que
+dependen de él, y las series intermedias se reescriben en el mismo buffer.
+Cambiar eta, por ejemplo, es una única multiplicación sobre la potencia por
+unidad más el resumen diario.
+"""
+import math
+import threading
+
+import numpy as np
+
+from agregados_gfv import inferir_paso, reducir_dias, tramos_dias
+from lectura_gfv import columna_viento, columnas_GT
+from modelo_gfv import (G_NOCT, T_NOCT, VALORES_ESTANDAR, aplicar_curva_rendimiento, factor_viento,
+                        normalizar_curva)
+
+# nodo: (parámetros de los que depende, nodos de los que depende), en orden de cálculo
+DEPENDENCIAS = {
+    'temperatura_celda': (('NOCT',), ()),
+    'factor_temperatura': (('kp', 'Tr'), ('temperatura_celda',)),
+    'factor_irradiancia': (('Gstd',), ()),
+    'potencia_unitaria': ((), ('factor_irradiancia', 'factor_temperatura')),
+    'potencia_bruta': (('N', 'Ppico', 'eta', 'curva_eta'), ('potencia_unitaria',)),
+    'potencia_inversor': (('curva_eta', 'Pinv'), ('potencia_bruta',)),
+    'resultados': (('Pinv', 'mu'), ('potencia_inversor',)),
+}
+
+
+def _valor(inputs, nombre):
+    # valor comparable de un parámetro: NaN (desactivado) pasa a None y la curva a tupla
+    if nombre == 'curva_eta':
+        return normalizar_curva(inputs.get(nombre))
+    valor = float(inputs.get(nombre, VALORES_ESTANDAR.get(nombre, math.nan)))
+    return None if math.isnan(valor) else valor
+
+
+class CalculoIncremental:
+    """Resultados de un escenario sobre una tabla, recalculando sólo lo afectado.
+
+    Se crea una vez por tabla y se reutiliza entre ejecuciones: calcular()
+    compara los parámetros con los de la llamada anterior. Los resultados
+    devueltos son arreglos nuevos, así que no cambian cuando la instancia se
+    recalcula con otros parámetros.
+    """
+
+    def __init__(self, tabla, paso_h=None):
+        nombre_G, nombre_T = columnas_GT(tabla)
+        nombre_V = columna_viento(tabla)
+        self.indice = tabla.index
+        self.G = tabla[nombre_G].to_numpy(dtype=float)
+        self.T = tabla[nombre_T].to_numpy(dtype=float)
+        self.V = None if nombre_V is None else tabla[nombre_V].to_numpy(dtype=float)
+        self.paso_h = inferir_paso(self.indice) if paso_h is None else paso_h
+        # días, duraciones y faltantes dependen sólo de la tabla: ningún parámetro los cambia
+        self._tramos = tramos_dias(self.indice, self.paso_h, np.isnan(self.G) | np.isnan(self.T))
+
+        self._valores = {}
+        self._parametros = {}
+        self._calentamiento = None
+        # nodos recalculados en la última llamada, para mostrarlos en el panel de depuración
+        self.recalculados = []
+        # la instancia se comparte entre sesiones desde la caché de la app
+        self._candado = threading.Lock()
+
+    def calcular(self, inputs):
+        """(potencia limitada, energía por muestra, ResumenDiario) del escenario inputs."""
+        with self._candado:
+            self.recalculados = []
+            try:
+                for nodo, (parametros, previos) in DEPENDENCIAS.items():
+                    actuales = {nombre: _valor(inputs, nombre) for nombre in parametros}
+                    if (nodo in self._valores and self._parametros[nodo] == actuales
+                            and not any(previo in self.recalculados for previo in previos)):
+                        continue
+                    self._valores[nodo] = getattr(self, f'_calcular_{nodo}')(actuales, inputs)
+                    self._parametros[nodo] = actuales
+                    self.recalculados.append(nodo)
+            except Exception:
+                # un nodo a medio calcular deja el resto inconsistente: la próxima vez se parte de cero
+                self._valores.clear()
+                raise
+            return self._valores['resultados']
+
+    def _buffer(self, nodo):
+        # las series intermedias se reescriben en el mismo arreglo en cada recálculo
+        valor = self._valores.get(nodo)
+        if isinstance(valor, np.ndarray) and valor is not self.T and valor is not self.G:
+            return valor
+        return np.empty_like(self.G)
+
+    def _calcular_temperatura_celda(self, p, inputs):
+        if p['NOCT'] is None:
+            return self.T
+        if self._calentamiento is None:
+            # G corregida por viento: sólo depende de los datos, se calcula una vez
+            self._calentamiento = self.G * factor_viento(self.V)
+        Tc = self._buffer('temperatura_celda')
+        np.multiply(self._calentamiento, (p['NOCT'] - T_NOCT) / G_NOCT, out=Tc)
+        Tc += self.T
+        return Tc
+
+    def _calcular_factor_temperatura(self, p, inputs):
+        # 1 + kp (T_c - Tr) = kp T_c + (1 - kp Tr)
+        factor = self._buffer('factor_temperatura')
+        np.multiply(self._valores['temperatura_celda'], p['kp'], out=factor)
+        factor += 1 - p['kp'] * p['Tr']
+        return factor
+
+    def _calcular_factor_irradiancia(self, p, inputs):
+        factor = self._buffer('factor_irradiancia')
+        np.divide(self.G, p['Gstd'], out=factor)
+        return factor
+
+    def _calcular_potencia_unitaria(self, p, inputs):
+        # potencia por W pico instalado y rendimiento unitario, en kW
+        unitaria = self._buffer('potencia_unitaria')
+        np.multiply(self._valores['factor_irradiancia'], self._valores['factor_temperatura'], out=unitaria)
+        unitaria *= 1e-3
+        return unitaria
+
+    def _calcular_potencia_bruta(self, p, inputs):
+        # N, Ppico y eta sólo escalan: una multiplicación sobre la potencia unitaria
+        eta = 1.0 if p['curva_eta'] else p['eta']
+        bruta = self._buffer('potencia_bruta')
+        np.multiply(self._valores['potencia_unitaria'], p['N'] * p['Ppico'] * eta, out=bruta)
+        return bruta
+
+    def _calcular_potencia_inversor(self, p, inputs):
+        if p['curva_eta'] is None:
+            return self._valores['potencia_bruta']
+        potencia = self._buffer('potencia_inversor')
+        if potencia is self._valores['potencia_bruta']:
+            potencia = np.empty_like(self.G)
+        return aplicar_curva_rendimiento(self._valores['potencia_bruta'], p['Pinv'], p['curva_eta'],
+                                         out=potencia)
+
+    def _calcular_resultados(self, p, inputs):
+        # reducir_dias limita in situ: se le pasa una copia, que queda como resultado
+        escenario = {'Pinv': math.inf if p['Pinv'] is None else p['Pinv'], 'mu': p['mu'] or 0.0}
+        P = self._valores['potencia_inversor'][np.newaxis].copy()
+        Pr, resumen = reducir_dias(P, [{**inputs, **escenario}], self._tramos, self.paso_h)
+        return Pr[0], Pr[0] * self._tramos[2], resumen
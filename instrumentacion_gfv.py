@@ -0,0 +1,84 @@
+"""Medición de tiempos y memoria de cada etapa de una ejecución de la app.
+
+Con el medidor desactivado, etapa() devuelve siempre el mismo contexto vacío,
+así que instrumentar el código no agrega costo cuando el panel está apagado.
+"""
+import json
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager, nullcontext
+
+_SIN_MEDICION = nullcontext()
+
+
+class Medidor:
+    """Registra tiempo de reloj y memoria asignada de etapas con nombre.
+
+    tracemalloc es global al proceso y varias sesiones pueden tener el panel
+    encendido a la vez: se cuentan los medidores activos vivos y el trazado
+    se detiene cuando se libera el último, si lo había iniciado un medidor.
+    """
+
+    # medidores activos todavía vivos, y si tracemalloc lo inició uno de ellos (y no otra herramienta)
+    _activos = 0
+    _trazado_propio = False
+    _candado = threading.Lock()
+
+    def __init__(self, activo=False):
+        self.activo = activo
+        self.registros = []
+        if activo:
+            Medidor._registrar()
+            # el medidor de cada ejecución se libera cuando la siguiente lo reemplaza
+            weakref.finalize(self, Medidor._liberar)
+
+    @classmethod
+    def _registrar(cls):
+        with cls._candado:
+            if not cls._activos and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                cls._trazado_propio = True
+            cls._activos += 1
+
+    @classmethod
+    def _liberar(cls):
+        with cls._candado:
+            cls._activos -= 1
+            if not cls._activos and cls._trazado_propio:
+                tracemalloc.stop()
+                cls._trazado_propio = False
+
+    def etapa(self, nombre):
+        if not self.activo:
+            return _SIN_MEDICION
+        return self._medir(nombre)
+
+    @contextmanager
+    def _medir(self, nombre):
+        # las etapas no se anidan: reiniciar el pico afectaría a la etapa exterior
+        tracemalloc.reset_peak()
+        memoria_inicial = tracemalloc.get_traced_memory()[0]
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            memoria_final, pico = tracemalloc.get_traced_memory()
+            self.registros.append({
+                'etapa': nombre,
+                'segundos': segundos,
+                'memoria pico (MiB)': (pico - memoria_inicial) / 2**20,
+                'memoria retenida (MiB)': (memoria_final - memoria_inicial) / 2**20,
+            })
+
+    def total(self):
+        return sum(registro['segundos'] for registro in self.registros)
+
+    def a_json(self):
+        return json.dumps({'etapas': self.registros, 'total (s)': self.total()}, indent=2)
+
+
+# para funciones que aceptan un medidor opcional
+SIN_INSTRUMENTAR = Medidor()
@@ -0,0 +1,126 @@
+"""Lectura de las series de irradiancia y temperatura.
+
+Además de .xlsx se aceptan CSV, Parquet y Arrow/Feather. Una tabla ya leída
+puede convertirse una única vez a un directorio de arreglos .npy, que luego
+se abren mapeados en memoria y llegan al modelo sin copias.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FORMATOS = ('xlsx', 'csv', 'parquet', 'feather', 'arrow')
+
+# directorio donde quedan las tablas convertidas, una carpeta por hash de archivo
+DIRECTORIO_COLUMNAR = Path('.datos_gfv')
+
+_ARCHIVO_COLUMNAS = 'columnas.json'
+
+# texto que identifica la columna de velocidad del viento, sin distinguir mayúsculas
+NOMBRES_VIENTO = ('viento', 'wind')
+
+
+def extension(archivo):
+    # sirve tanto para rutas como para los archivos subidos con st.file_uploader
+    nombre = archivo if isinstance(archivo, (str, Path)) else archivo.name
+    return Path(nombre).suffix.lower().lstrip('.')
+
+
+def normalizar_tabla(tabla):
+    # Feather (y Parquet escrito sin índice) devuelven la fecha como primera columna
+    if isinstance(tabla.index, pd.RangeIndex):
+        primera = tabla.columns[0]
+        if pd.api.types.is_datetime64_any_dtype(tabla[primera]):
+            tabla = tabla.set_index(primera)
+    # fechas guardadas como texto
+    if tabla.index.dtype == object:
+        tabla.index = pd.to_datetime(tabla.index)
+    return tabla
+
+
+def leer_tabla(archivo):
+    """Lee una tabla con la fecha como índice, cualquiera sea el formato."""
+    formato = extension(archivo)
+    if formato == 'xlsx':
+        tabla = pd.read_excel(archivo, index_col=0)
+    elif formato == 'csv':
+        tabla = pd.read_csv(archivo, index_col=0, parse_dates=True)
+    elif formato == 'parquet':
+        tabla = pd.read_parquet(archivo)
+    elif formato in ('feather', 'arrow'):
+        tabla = pd.read_feather(archivo)
+    else:
+        raise ValueError(f'Formato no soportado: .{formato} (se aceptan {", ".join(FORMATOS)})')
+    return normalizar_tabla(tabla)
+
+
+def columnas_GT(tabla):
+    # la primera columna es la irradiancia y la segunda la temperatura
+    nombre_G, nombre_T = tabla.columns[:2]
+    return nombre_G, nombre_T
+
+
+def columna_viento(tabla):
+    # la velocidad del viento (m/s) es la primera columna después de G y T cuyo nombre la
+    # identifica: cualquier otra (humedad, una potencia exportada antes) no debe tomarse por viento
+    for nombre in tabla.columns[2:]:
+        if any(clave in str(nombre).lower() for clave in NOMBRES_VIENTO):
+            return nombre
+    return None
+
+
+def columnas_ignoradas(tabla):
+    # columnas que no son G, T ni el viento: no intervienen en el cálculo
+    viento = columna_viento(tabla)
+    return [nombre for nombre in tabla.columns[2:] if nombre != viento]
+
+
+def convertir_a_columnar(tabla, directorio):
+    """Guarda el índice y cada columna como .npy de float64 en directorio."""
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+
+    np.save(directorio / 'indice.npy', tabla.index.to_numpy(dtype='datetime64[ns]'))
+    for posicion, nombre in enumerate(tabla.columns):
+        np.save(directorio / f'columna_{posicion}.npy', tabla[nombre].to_numpy(dtype=float))
+
+    # las columnas se escriben al final: su presencia indica que la conversión terminó
+    with open(directorio / _ARCHIVO_COLUMNAS, 'w', encoding='utf-8') as archivo:
+        json.dump([str(nombre) for nombre in tabla.columns], archivo)
+    return directorio
+
+
+def es_columnar(directorio):
+    return (Path(directorio) / _ARCHIVO_COLUMNAS).exists()
+
+
+def cargar_columnar(directorio):
+    """Abre una tabla convertida mapeando los .npy en memoria.
+
+    El DataFrame devuelto no copia los datos: to_numpy() de cada columna
+    entrega una vista de sólo lectura del archivo.
+    """
+    directorio = Path(directorio)
+    with open(directorio / _ARCHIVO_COLUMNAS, encoding='utf-8') as archivo:
+        nombres = json.load(archivo)
+
+    indice = pd.DatetimeIndex(np.load(directorio / 'indice.npy', mmap_mode='r'))
+    datos = {nombre: np.load(directorio / f'columna_{posicion}.npy', mmap_mode='r')
+             for posicion, nombre in enumerate(nombres)}
+    return pd.DataFrame(datos, index=indice, copy=False)
+
+
+def leer_registros(ruta):
+    """Objetos de un .json (lista) o filas de un .csv como diccionarios.
+
+    Las celdas vacías del .csv no se incluyen, así el parámetro toma su
+    valor estándar en lugar de NaN.
+    """
+    ruta = Path(ruta)
+    if ruta.suffix.lower() == '.json':
+        with open(ruta, encoding='utf-8') as archivo:
+            return json.load(archivo)
+    return [{clave: valor for clave, valor in fila.items()
+             if not (isinstance(valor, float) and np.isnan(valor))}
+            for fila in pd.read_csv(ruta).to_dict('records')]
@@ -0,0 +1,286 @@
+"""Modelo de potencia del generador fotovoltaico (GFV).
+
+Se separa del script de Streamlit para poder importarlo sin levantar la
+página, y se vectoriza con NumPy para evaluar muchos escenarios a la vez.
+"""
+import functools
+
+import numpy as np
+
+# parámetros que definen un escenario: modelo de la ec. (1), límite del inversor
+# y temperatura nominal de operación de la celda (NOCT)
+PARAMETROS = ('N', 'Ppico', 'kp', 'eta', 'Gstd', 'Tr', 'Pinv', 'mu', 'NOCT')
+
+# valores que se usan cuando un escenario no los trae; sin inversor no hay límite
+# y sin NOCT la temperatura medida se usa directamente como temperatura de celda
+VALORES_ESTANDAR = {'Gstd': 1000.0, 'Tr': 25.0, 'Pinv': np.inf, 'mu': 0.0, 'NOCT': np.nan}
+
+# GFV de la UTN Facultad Regional Santa Fe (inversor SMA SB2.5-1VL-40)
+PARAMETROS_UTN = {'N': 12, 'Ppico': 240, 'kp': -0.0044, 'eta': 0.97,
+                  'Gstd': 1000, 'Tr': 25, 'Pinv': 2.5, 'mu': 0.01}
+
+# curva típica de rendimiento de un inversor de string chico, como pares (P/P_inv, η):
+# cae a baja carga y es casi plana por encima del 30 %
+CURVA_RENDIMIENTO_TIPICA = ((0.05, 0.900), (0.10, 0.945), (0.20, 0.962), (0.25, 0.965),
+                            (0.30, 0.967), (0.50, 0.970), (0.75, 0.969), (1.00, 0.967))
+
+# celdas de la tabla de búsqueda con que se evalúa una curva de rendimiento
+CELDAS_CURVA = 4096
+
+# la curva se evalúa en P / P_inv: sin P_inv finita toda la serie caería en la carga más baja
+_SIN_PINV = 'La curva de rendimiento necesita una potencia de inversor (Pinv) finita'
+
+# condiciones en las que se define la NOCT: 800 W/m2, 20 °C de ambiente y viento de 1 m/s
+G_NOCT = 800.0
+T_NOCT = 20.0
+
+
+def potencia_gfv(G, T, N, Ppico, kp, eta, Gstd=1000, Tr=25):
+    # ecuación (1), sirve tanto para escalares como para arreglos del mismo tamaño
+    return N * Ppico * G / Gstd * (1 + kp * (T - Tr)) * eta * 1e-3
+
+
+def factor_viento(V, out=None):
+    # corrección de la NOCT por velocidad del viento V (m/s): 9.5 / (5.7 + 3.8 V),
+    # que vale 1 con 1 m/s; sin medición se supone el viento de referencia
+    if V is None:
+        return 1.0
+    # se opera siempre sobre un arreglo propio: con V escalar np.add devolvería un escalar
+    factor = np.array(V, dtype=float) if out is None else out
+    np.add(V, 1.5, out=factor)
+    np.divide(2.5, factor, out=factor)
+    # la suma detecta faltantes sin armar una máscara en el caso habitual
+    if np.isnan(factor.sum()):
+        np.copyto(factor, 1.0, where=np.isnan(factor))
+    # un V escalar da un factor escalar
+    return factor[()] if factor.ndim == 0 else factor
+
+
+def temperatura_celda(G, T, NOCT, V=None):
+    # temperatura de celda a partir de la ambiente T, la irradiancia G y, si se mide, el viento V
+    return T + (NOCT - T_NOCT) / G_NOCT * G * factor_viento(V)
+
+
+def normalizar_curva(curva):
+    # pares (carga, rendimiento) ordenados por carga, como tupla para poder usarla de clave
+    if curva is None:
+        return None
+    puntos = tuple(sorted((float(carga), float(rendimiento)) for carga, rendimiento in curva))
+    if len(puntos) < 2 or puntos[0][0] < 0 or puntos[-1][0] <= 0:
+        raise ValueError('La curva de rendimiento necesita al menos dos puntos con carga >= 0')
+    if any(np.isnan(valor) for punto in puntos for valor in punto):
+        raise ValueError('La curva de rendimiento tiene valores faltantes')
+    return puntos
+
+
+@functools.lru_cache(maxsize=32)
+def tabla_rendimiento(curva):
+    """Tabla de búsqueda de una curva de rendimiento del inversor η(P/P_inv).
+
+    curva son pares (carga, rendimiento) ya normalizados. Se divide [0, carga
+    máxima] en CELDAS_CURVA celdas y se guarda el rendimiento interpolado en el
+    centro de cada una, así evaluar la curva es sólo indexar. Los escenarios con
+    la misma curva comparten la tabla. Devuelve (tabla, celdas por unidad de carga).
+    """
+    carga, rendimiento = np.array(curva).T
+    ancho = carga[-1] / CELDAS_CURVA
+    tabla = np.interp((np.arange(CELDAS_CURVA) + 0.5) * ancho, carga, rendimiento)
+    tabla.flags.writeable = False
+    return tabla, 1 / ancho
+
+
+def aplicar_curva_rendimiento(P, Pinv, curva, out=None):
+    """P * η(P / P_inv), con η de la curva dada por pares (carga, rendimiento).
+
+    P puede ser una serie o una matriz escenarios x instantes con un Pinv por
+    escenario. Fuera del rango de la curva se usa el rendimiento del extremo.
+    """
+    tabla, celdas_por_carga = tabla_rendimiento(normalizar_curva(curva))
+    P = np.asarray(P, dtype=float)
+    Pinv = np.asarray(Pinv, dtype=float)
+    if not np.isfinite(Pinv).all():
+        raise ValueError(_SIN_PINV)
+    if P.ndim == 2 and Pinv.ndim:
+        Pinv = Pinv.reshape(-1, 1)
+
+    # el índice de la celda sale de truncar la carga escalada; los faltantes se descartan al recortar
+    with np.errstate(invalid='ignore'):
+        celda = np.atleast_1d(np.multiply(P, celdas_por_carga / Pinv)).astype(np.intp)
+    np.clip(celda, 0, CELDAS_CURVA - 1, out=celda)
+    return np.multiply(P, tabla.take(celda).reshape(P.shape), out=out)
+
+
+def curvas_escenarios(escenarios, cantidad):
+    # curva de rendimiento de cada escenario (None: η constante); en la forma de
+    # diccionario de secuencias la curva, si está, es común a todos
+    if isinstance(escenarios, dict):
+        return [normalizar_curva(escenarios.get('curva_eta'))] * cantidad
+    return [normalizar_curva(escenario.get('curva_eta')) for escenario in escenarios]
+
+
+def armar_escenarios(escenarios):
+    """Convierte los escenarios a un diccionario de arreglos de largo S.
+
+    Acepta una lista de diccionarios (uno por escenario) o un diccionario
+    de secuencias (una por parámetro). Las claves que no son parámetros del
+    modelo se ignoran, salvo 'curva_eta': los escenarios con curva deben
+    tener Pinv finita.
+    """
+    if isinstance(escenarios, dict):
+        columnas = {clave: np.atleast_1d(np.asarray(valor, dtype=float))
+                    for clave, valor in escenarios.items() if clave in PARAMETROS}
+        cantidad = max((len(valor) for valor in columnas.values()), default=1)
+    else:
+        escenarios = list(escenarios)
+        cantidad = len(escenarios)
+        columnas = {}
+        for clave in PARAMETROS:
+            # un parámetro con valor estándar puede faltar sólo en algunos escenarios
+            if all(clave in escenario for escenario in escenarios) or (
+                    clave in VALORES_ESTANDAR and any(clave in escenario for escenario in escenarios)):
+                columnas[clave] = np.array([escenario.get(clave, VALORES_ESTANDAR.get(clave))
+                                            for escenario in escenarios], dtype=float)
+
+    for clave, valor in VALORES_ESTANDAR.items():
+        columnas.setdefault(clave, np.full(cantidad, valor))
+    faltantes = [clave for clave in PARAMETROS if clave not in columnas]
+    if faltantes:
+        raise ValueError(f'Faltan parámetros del modelo: {", ".join(faltantes)}')
+    if isinstance(escenarios, dict):
+        con_curva = escenarios.get('curva_eta') is not None
+    else:
+        con_curva = np.array([escenario.get('curva_eta') is not None for escenario in escenarios], dtype=bool)
+    if (con_curva & ~np.isfinite(columnas['Pinv'])).any():
+        raise ValueError(_SIN_PINV)
+
+    return {clave: np.broadcast_to(valor, (cantidad,)) for clave, valor in columnas.items()}
+
+
+def potencia_escenarios(G, T, escenarios, V=None):
+    """Potencia (kW) de cada escenario en cada instante.
+
+    G y T son series de largo n (irradiancia en W/m2 y temperatura ambiente
+    en °C) y V, opcional, la velocidad del viento en m/s. Los escenarios con
+    NOCT corrigen la temperatura de celda con temperatura_celda; los demás
+    usan T directamente. Los escenarios con 'curva_eta' (pares P/P_inv,
+    rendimiento) reemplazan el eta constante por esa curva. Devuelve una
+    matriz (escenarios x instantes) calculada por broadcasting, sin recorrer
+    los escenarios en Python.
+    """
+    G = np.asarray(G, dtype=float)
+    T = np.asarray(T, dtype=float)
+    if not isinstance(escenarios, dict):
+        escenarios = list(escenarios)
+    p = armar_escenarios(escenarios)
+    curvas = curvas_escenarios(escenarios, len(p['N']))
+    # con curva, el rendimiento se aplica al final según la carga del inversor
+    eta = np.array([1.0 if curva else valor for curva, valor in zip(curvas, p['eta'])])
+
+    # escala * [1 + kp (T_c - Tr)] = (escala kp) T_c + escala (1 - kp Tr): todo lo que
+    # no depende del tiempo se junta en dos factores por escenario
+    escala = p['N'] * p['Ppico'] * eta * 1e-3 / p['Gstd']
+    pendiente = (escala * p['kp'])[:, None]
+    constante = (escala * (1 - p['kp'] * p['Tr']))[:, None]
+
+    # se opera in situ sobre P para no crear una matriz temporal por cada término
+    con_noct = ~np.isnan(p['NOCT'])
+    if con_noct.any():
+        # T_c - T = coeficiente del escenario x calentamiento común a todos
+        coeficiente = np.where(con_noct, (p['NOCT'] - T_NOCT) / G_NOCT, 0.0)
+        P = np.empty((len(coeficiente), len(G)))
+        # la primera fila sirve de buffer para el calentamiento, así no se reserva otra serie
+        calentamiento = P[0]
+        if V is None:
+            np.copyto(calentamiento, G)
+        else:
+            factor_viento(V, out=calentamiento)
+            calentamiento *= G
+        np.multiply(coeficiente[1:, None], calentamiento, out=P[1:])
+        calentamiento *= coeficiente[0]
+        P += T
+        P *= pendiente
+    else:
+        P = np.multiply.outer(pendiente[:, 0], T)
+    P += constante
+    P *= G
+
+    # una pasada por curva distinta: los escenarios repetidos comparten tabla y pasada
+    for curva in set(curvas) - {None}:
+        filas = [posicion for posicion, otra in enumerate(curvas) if otra == curva]
+        if len(filas) == len(curvas):
+            aplicar_curva_rendimiento(P, p['Pinv'], curva, out=P)
+        else:
+            P[filas] = aplicar_curva_rendimiento(P[filas], p['Pinv'][filas], curva)
+    return P
+
+
+def potencia_instantanea(G, T, parametros, V=None):
+    """(P, P_r): potencia del GFV y potencia entregada por el inversor, en kW.
+
+    Es el cálculo puntual de la pestaña Cálculos para un escenario (mu en por
+    unidad, NOCT y curva_eta opcionales); G y T pueden ser escalares o series.
+    """
+    p = {**VALORES_ESTANDAR, **parametros}
+    Tc = T if np.isnan(p['NOCT']) else temperatura_celda(G, T, p['NOCT'], V)
+    curva = normalizar_curva(p.get('curva_eta'))
+    if curva is None:
+        P = potencia_gfv(G, Tc, p['N'], p['Ppico'], p['kp'], p['eta'], p['Gstd'], p['Tr'])
+    else:
+        P = aplicar_curva_rendimiento(potencia_gfv(G, Tc, p['N'], p['Ppico'], p['kp'], 1, p['Gstd'], p['Tr']),
+                                      p['Pinv'], curva)
+    return P, limitar_potencia(P, p['Pinv'], p['mu'], 1)[0]
+
+
+def integrar(X, paso_h, segmentos=None):
+    # suma sobre el eje del tiempo ponderada por la duración de cada lapso (h);
+    # con segmentos (índices de inicio) se obtiene una suma por segmento
+    if segmentos is not None:
+        if np.ndim(paso_h) == 0:
+            return np.add.reduceat(X, segmentos, axis=-1) * paso_h
+        return np.add.reduceat(X * paso_h, segmentos, axis=-1)
+    if np.ndim(paso_h) == 0:
+        return X.sum(axis=-1) * paso_h
+    return X @ np.asarray(paso_h, dtype=float)
+
+
+def limitar_potencia(P, Pinv, mu, paso_h, out=None, segmentos=None):
+    """Aplica el límite de generación del inversor.
+
+    P_r = 0 si P <= P_min, P si P_min < P <= P_inv y P_inv si P > P_inv, con
+    P_min = mu * P_inv (mu en por unidad). P puede ser una serie o una matriz
+    escenarios x instantes; Pinv y mu pueden ser escalares o uno por escenario.
+    paso_h es la duración de cada lapso en horas (escalar o una por instante).
+
+    Devuelve (P_r, energía recortada por superar P_inv, energía perdida por
+    no superar P_min), ambas energías en kWh y una por escenario. Son unas
+    seis pasadas vectorizadas sobre P (la máscara de umbral, el mínimo con
+    P_inv, la anulación bajo umbral y tres integrales: bruta, limitada y
+    entregada), sin matrices intermedias además de la máscara; si se pasa
+    out, P_r se escribe ahí (puede ser el mismo P). Con segmentos (índices
+    de inicio de cada tramo, p. ej. de cada día) las energías se devuelven
+    por tramo.
+    """
+    P = np.asarray(P, dtype=float)
+    Pinv = np.asarray(Pinv, dtype=float)
+    mu = np.asarray(mu, dtype=float)
+    if P.ndim == 2:
+        Pinv = Pinv.reshape(-1, 1) if Pinv.ndim else Pinv
+        mu = mu.reshape(-1, 1) if mu.ndim else mu
+    # sin inversor (P_inv infinita) no hay umbral: el producto daría inf (o inf * 0)
+    with np.errstate(invalid='ignore'):
+        Pmin = np.nan_to_num(mu * Pinv, nan=0.0, posinf=0.0)
+
+    Pr = np.empty_like(P) if out is None else out
+    energia_bruta = integrar(P, paso_h, segmentos)
+    bajo_umbral = np.less_equal(P, Pmin)
+
+    # el orden permite que out sea el mismo P: cada paso sólo necesita P_r
+    np.minimum(P, Pinv, out=Pr)
+    energia_limitada = integrar(Pr, paso_h, segmentos)
+    np.copyto(Pr, 0.0, where=bajo_umbral)
+    energia_entregada = integrar(Pr, paso_h, segmentos)
+
+    # como P_min <= P_inv, lo que se anula por umbral nunca fue recortado
+    energia_recortada = energia_bruta - energia_limitada
+    energia_umbral = energia_limitada - energia_entregada
+    return Pr, energia_recortada, energia_umbral
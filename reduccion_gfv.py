@@ -0,0 +1,78 @@
+"""Reducción de series para graficar con una cantidad acotada de puntos.
+
+Un gráfico no puede mostrar más puntos que píxeles de ancho, así que
+enviarle al navegador toda la serie sólo agranda la carga. Se ofrecen dos
+métodos: min-max, que conserva el mínimo y el máximo de cada tramo (la
+envolvente de la serie), y LTTB (Largest Triangle Three Buckets), que
+conserva mejor la forma visual.
+"""
+import numpy as np
+
+METODOS = ('minmax', 'lttb')
+
+
+def indices_minmax(y, puntos):
+    """Índices del mínimo y el máximo de cada uno de puntos/2 tramos, ordenados."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= puntos:
+        return np.arange(n)
+
+    tramos = max(1, puntos // 2)
+    tamano = -(-n // tramos)
+    completos = n // tamano
+    bloque = y[:completos * tamano].reshape(completos, tamano)
+    base = np.arange(completos) * tamano
+
+    # los faltantes no deben ganar ni como mínimo ni como máximo
+    minimos = base + np.argmin(np.where(np.isnan(bloque), np.inf, bloque), axis=1)
+    maximos = base + np.argmax(np.where(np.isnan(bloque), -np.inf, bloque), axis=1)
+    extremos = [minimos, maximos, [0, n - 1]]
+    if completos * tamano < n:
+        resto = y[completos * tamano:]
+        extremos.append(completos * tamano + np.array([np.nanargmin(resto), np.nanargmax(resto)])
+                        if not np.isnan(resto).all() else [])
+    return np.unique(np.concatenate(extremos).astype(np.int64))
+
+
+def indices_lttb(y, puntos):
+    """Índices elegidos por Largest Triangle Three Buckets, ordenados."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= puntos or puntos < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    bordes = np.linspace(1, n - 1, puntos - 1).astype(np.int64)
+    elegidos = np.empty(puntos, dtype=np.int64)
+    elegidos[0], elegidos[-1] = 0, n - 1
+
+    # cada tramo depende del punto elegido en el anterior, por eso el lazo es por tramo
+    anterior = 0
+    for posicion in range(puntos - 2):
+        inicio, fin = bordes[posicion], bordes[posicion + 1]
+        siguiente_fin = bordes[posicion + 2] if posicion + 2 < len(bordes) else n
+        # el vértice opuesto es el promedio del tramo siguiente (sin contar faltantes)
+        validos = y[fin:siguiente_fin]
+        validos = validos[~np.isnan(validos)]
+        media_x = x[fin:siguiente_fin].mean() if siguiente_fin > fin else x[-1]
+        media_y = validos.mean() if len(validos) else y[anterior]
+
+        area = np.abs((x[anterior] - media_x) * (y[inicio:fin] - y[anterior])
+                      - (x[anterior] - x[inicio:fin]) * (media_y - y[anterior]))
+        anterior = inicio + int(np.nanargmax(area)) if not np.isnan(area).all() else inicio
+        elegidos[posicion + 1] = anterior
+    return elegidos
+
+
+def reducir(serie, puntos, metodo='minmax'):
+    """Serie de pandas reducida a lo sumo a unos puntos puntos (sin copiar si ya es corta)."""
+    if len(serie) <= puntos:
+        return serie
+    if metodo == 'minmax':
+        indices = indices_minmax(serie.to_numpy(), puntos)
+    elif metodo == 'lttb':
+        indices = indices_lttb(serie.to_numpy(), puntos)
+    else:
+        raise ValueError(f'Método de reducción desconocido: {metodo}')
+    return serie.iloc[indices]
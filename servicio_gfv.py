@@ -0,0 +1,400 @@
+"""Servicio HTTP/JSON local con el modelo y los resúmenes de la app.
+
+Servidor asyncio de la biblioteca estándar (HTTP/1.1 con conexiones
+persistentes) pensado para otras herramientas en la misma máquina:
+
+    POST /datos        cuerpo: el archivo (con ?nombre=serie.parquet) o {"ruta": ...},
+                       esto último sólo dentro del directorio de --archivos;
+                       devuelve la clave (hash del contenido) con que se lo consulta
+    POST /potencia     {"G": ..., "T": ..., parámetros} -> potencia y potencia entregada
+    POST /simular      {"datos": clave, "escenario": {...} o "escenarios": [...],
+                        "agregados": ["total", "anual", "estacional", "diario"],
+                        "hemisferio": "sur"}
+    GET  /estadisticas cachés, lotes calculados y pedidos atendidos
+    GET  /salud
+
+Los parámetros son los de un escenario del modelo, con mu en por unidad.
+Los pedidos de /simular que llegan juntos para la misma tabla se agrupan en
+una sola pasada de resumir_tabla con todos sus escenarios, y un escenario
+que ya se está calculando no se vuelve a encolar. Los resúmenes se guardan
+en una caché LRU por (hash de la tabla, parámetros) y las respuestas ya
+serializadas en otra, así una consulta repetida no toca NumPy.
+
+Ejemplo:
+    python servicio_gfv.py --puerto 8765
+    curl -s --data-binary @serie.parquet 'localhost:8765/datos?nombre=serie.parquet'
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import re
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from agregados_gfv import HEMISFERIOS, ResumenDiario, resumir_tabla
+from cache_gfv import CacheLRU, clave_parametros, hash_contenido
+from lectura_gfv import (DIRECTORIO_COLUMNAR, FORMATOS, cargar_columnar, columna_viento, columnas_ignoradas,
+                         convertir_a_columnar, es_columnar, extension, leer_tabla)
+from modelo_gfv import armar_escenarios, potencia_instantanea
+
+AGREGADOS = ('total', 'anual', 'estacional', 'diario')
+
+# tiempo que espera el primer pedido de un lote a que lleguen otros para la misma tabla
+ESPERA_LOTE = 0.002
+
+# cuerpo más grande que se acepta (un archivo de datos de varios años a 1 min entra holgado)
+MAXIMO_CUERPO = 512 * 2 ** 20
+
+# las claves de /datos son el SHA-256 del contenido: cualquier otra cosa no es una tabla
+_CLAVE_DATOS = re.compile(r'[0-9a-f]{64}')
+
+
+class ErrorPedido(Exception):
+    """Pedido inválido: se responde con estado y mensaje en lugar de un 500."""
+
+    def __init__(self, mensaje, estado=HTTPStatus.BAD_REQUEST):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _numero(valor):
+    # JSON no admite NaN ni infinitos: se envían como null
+    valor = float(valor)
+    return valor if math.isfinite(valor) else None
+
+
+def _fila(resumen, fila):
+    # resumen de un solo escenario dentro de un ResumenDiario de varios
+    return ResumenDiario(resumen.dias, {campo: valor[fila:fila + 1] for campo, valor in resumen.valores.items()},
+                         resumen.inicio, resumen.paso_h)
+
+
+def _totales(totales):
+    return {campo: _numero(valor[0]) for campo, valor in totales.items()}
+
+
+def agregar(resumen, agregados, hemisferio='sur'):
+    """Diccionario JSON con los agregados pedidos del resumen de un escenario."""
+    respuesta = {}
+    if 'total' in agregados:
+        respuesta['total'] = _totales(resumen.totales())
+    if 'anual' in agregados:
+        respuesta['anual'] = {str(anio): _totales(totales) for anio, totales in resumen.por_anio().items()}
+    if 'estacional' in agregados:
+        respuesta['estacional'] = {nombre: _totales(totales)
+                                   for nombre, totales in resumen.por_estacion(hemisferio).items()}
+    if 'diario' in agregados:
+        # por columnas, que ocupa mucho menos que un objeto por día
+        diario = {'dia': [str(dia) for dia in resumen.dias]}
+        for campo, valor in [*resumen.valores.items(), ('potencia_media', resumen.potencia_media())]:
+            diario[campo] = [_numero(dato) for dato in np.asarray(valor[0])]
+        respuesta['diario'] = diario
+    return respuesta
+
+
+class ServicioGFV:
+    """Estado del servicio: tablas registradas, lotes pendientes y cachés."""
+
+    def __init__(self, directorio=DIRECTORIO_COLUMNAR, espera=ESPERA_LOTE, archivos=None):
+        # las tablas se guardan en formato columnar: si salen de la caché se vuelven a mapear
+        self.directorio = Path(directorio)
+        # único directorio del que /datos acepta {"ruta": ...}; sin él sólo se reciben archivos
+        self.archivos = None if archivos is None else Path(archivos).resolve()
+        self.espera = espera
+        self.tablas = CacheLRU(4)
+        self.resultados = CacheLRU(256)
+        self.respuestas = CacheLRU(1024)
+        self.lotes = 0
+        self.pedidos = 0
+        # clave de la tabla -> {clave de parámetros: escenario} que esperan su lote
+        self._pendientes = {}
+        # (clave de la tabla, clave de parámetros) -> futuro del resumen en cálculo
+        self._en_curso = {}
+        # referencias a las tareas de los lotes, para que no se descarten antes de terminar
+        self._tareas = set()
+
+    # tablas
+
+    async def registrar(self, datos, nombre):
+        """Guarda la tabla de un archivo y devuelve su clave y su tamaño."""
+        if extension(nombre) not in FORMATOS:
+            raise ErrorPedido(f'Formato no soportado: {nombre!r} (se aceptan {", ".join(FORMATOS)})')
+        clave = hash_contenido(datos)
+        directorio = self.directorio / clave
+
+        def leer():
+            if not es_columnar(directorio):
+                # leer_tabla toma la extensión de .name, como con los archivos de st.file_uploader
+                archivo = io.BytesIO(datos)
+                archivo.name = nombre
+                convertir_a_columnar(leer_tabla(archivo), directorio)
+            return cargar_columnar(directorio)
+
+        tabla = await asyncio.get_running_loop().run_in_executor(None, leer)
+        self.tablas.obtener(clave, lambda: tabla)
+        return {'datos': clave, 'filas': len(tabla),
+                'desde': str(tabla.index[0]) if len(tabla) else None,
+                'hasta': str(tabla.index[-1]) if len(tabla) else None,
+                'viento': None if columna_viento(tabla) is None else str(columna_viento(tabla)),
+                'columnas_ignoradas': [str(nombre) for nombre in columnas_ignoradas(tabla)]}
+
+    async def tabla(self, clave):
+        _validar_clave(clave)
+        if clave in self.tablas:
+            return self.tablas.obtener(clave, None)
+        directorio = self.directorio / clave
+        if not es_columnar(directorio):
+            raise ErrorPedido(f'No hay datos registrados con la clave {clave!r}', HTTPStatus.NOT_FOUND)
+        tabla = await asyncio.get_running_loop().run_in_executor(None, cargar_columnar, directorio)
+        return self.tablas.obtener(clave, lambda: tabla)
+
+    # lotes
+
+    async def resumen(self, clave_datos, escenario):
+        """ResumenDiario del escenario sobre la tabla, calculado junto con los pedidos simultáneos."""
+        clave = (clave_datos, clave_parametros(escenario))
+        if clave in self.resultados:
+            return self.resultados.obtener(clave, None)
+        futuro = self._en_curso.get(clave)
+        if futuro is None:
+            futuro = asyncio.get_running_loop().create_future()
+            self._en_curso[clave] = futuro
+            lote = self._pendientes.setdefault(clave_datos, {})
+            if not lote:
+                asyncio.get_running_loop().call_later(self.espera, self._lanzar, clave_datos)
+            lote[clave[1]] = escenario
+        # shield: si un cliente se desconecta, el resultado sigue sirviendo a los demás
+        return await asyncio.shield(futuro)
+
+    def _lanzar(self, clave_datos):
+        lote = self._pendientes.pop(clave_datos)
+        tarea = asyncio.ensure_future(self._calcular_lote(clave_datos, lote))
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+
+    async def _calcular_lote(self, clave_datos, lote):
+        claves = list(lote)
+        try:
+            tabla = await self.tabla(clave_datos)
+            # una sola matriz escenarios x instantes para todo el lote, fuera del bucle de eventos
+            _, resumen = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: resumir_tabla(tabla, list(lote.values())))
+        except Exception as error:
+            for clave in claves:
+                self._en_curso.pop((clave_datos, clave)).set_exception(error)
+            return
+        self.lotes += 1
+        for fila, clave in enumerate(claves):
+            resultado = _fila(resumen, fila)
+            self.resultados.obtener((clave_datos, clave), lambda: resultado)
+            self._en_curso.pop((clave_datos, clave)).set_result(resultado)
+
+    # pedidos
+
+    def potencia(self, pedido):
+        parametros = _escenario(pedido)
+        try:
+            G = np.asarray(pedido['G'], dtype=float)
+            T = np.asarray(pedido['T'], dtype=float)
+            V = None if pedido.get('V') is None else np.asarray(pedido['V'], dtype=float)
+        except KeyError as error:
+            raise ErrorPedido(f'Falta {error.args[0]}') from None
+        P, P_r = potencia_instantanea(G, T, parametros, V)
+        return {'potencia': np.vectorize(_numero, otypes=[object])(P).tolist(),
+                'potencia_entregada': np.vectorize(_numero, otypes=[object])(P_r).tolist()}
+
+    async def simular(self, pedido):
+        clave_datos = pedido.get('datos')
+        if clave_datos is None:
+            raise ErrorPedido('Falta "datos", la clave devuelta por /datos')
+        _validar_clave(clave_datos)
+        agregados = tuple(pedido.get('agregados', ('total',)))
+        desconocidos = set(agregados) - set(AGREGADOS)
+        if desconocidos:
+            raise ErrorPedido(f'Agregados desconocidos: {", ".join(sorted(map(str, desconocidos)))}')
+        hemisferio = pedido.get('hemisferio', 'sur')
+        if hemisferio not in HEMISFERIOS:
+            raise ErrorPedido(f'Hemisferio desconocido: {hemisferio}')
+
+        varios = 'escenarios' in pedido
+        escenarios = [_escenario(escenario) for escenario in (pedido['escenarios'] if varios
+                                                               else [pedido.get('escenario', {})])]
+        resumenes = await asyncio.gather(*(self.resumen(clave_datos, escenario) for escenario in escenarios))
+        respuestas = [agregar(resumen, agregados, hemisferio) for resumen in resumenes]
+        return {'datos': clave_datos, 'escenarios': respuestas} if varios else {'datos': clave_datos,
+                                                                                  **respuestas[0]}
+
+    def archivo_local(self, ruta):
+        """Ruta resuelta de un archivo dentro de self.archivos, el único lugar que se lee."""
+        if self.archivos is None:
+            raise ErrorPedido('El servicio no lee archivos locales: envíe el archivo en el cuerpo '
+                              '(o inícielo con --archivos)', HTTPStatus.FORBIDDEN)
+        if not isinstance(ruta, str) or not ruta:
+            raise ErrorPedido('Falta "ruta", relativa al directorio de archivos')
+        ruta_archivo = (self.archivos / ruta).resolve()
+        if not ruta_archivo.is_relative_to(self.archivos):
+            raise ErrorPedido(f'{ruta!r} está fuera del directorio de archivos', HTTPStatus.FORBIDDEN)
+        if not ruta_archivo.is_file():
+            raise ErrorPedido(f'No existe el archivo {ruta!r}', HTTPStatus.NOT_FOUND)
+        return ruta_archivo
+
+    def estadisticas(self):
+        return {'pedidos': self.pedidos, 'lotes': self.lotes, 'en_curso': len(self._en_curso),
+                **{nombre: cache.estadisticas() for nombre, cache in
+                   (('tablas', self.tablas), ('resultados', self.resultados), ('respuestas', self.respuestas))}}
+
+    async def manejar(self, metodo, destino, cuerpo):
+        """(estado, cuerpo JSON) de un pedido."""
+        partes = urlsplit(destino)
+        ruta = partes.path.rstrip('/') or '/'
+        rutas = {'/salud': 'GET', '/estadisticas': 'GET', '/datos': 'POST', '/potencia': 'POST',
+                 '/simular': 'POST'}
+        if ruta not in rutas:
+            raise ErrorPedido(f'No existe {ruta}', HTTPStatus.NOT_FOUND)
+        if metodo != rutas[ruta]:
+            raise ErrorPedido(f'{ruta} se pide con {rutas[ruta]}', HTTPStatus.METHOD_NOT_ALLOWED)
+
+        if ruta == '/salud':
+            return HTTPStatus.OK, _json({'estado': 'ok'})
+        if ruta == '/estadisticas':
+            return HTTPStatus.OK, _json(self.estadisticas())
+        if ruta == '/datos':
+            nombre = parse_qs(partes.query).get('nombre', [None])[0]
+            if nombre is None:
+                # sin nombre, el cuerpo es {"ruta": ...} con un archivo local
+                ruta_archivo = self.archivo_local(_leer_json(cuerpo).get('ruta'))
+                cuerpo, nombre = ruta_archivo.read_bytes(), ruta_archivo.name
+            return HTTPStatus.OK, _json(await self.registrar(cuerpo, nombre))
+
+        pedido = _leer_json(cuerpo)
+        if ruta == '/potencia':
+            return HTTPStatus.OK, _json(self.potencia(pedido))
+        # la respuesta serializada se guarda por pedido: repetirlo es sólo buscarla
+        clave = (pedido.get('datos'), json.dumps(pedido, sort_keys=True))
+        if clave in self.respuestas:
+            return HTTPStatus.OK, self.respuestas.obtener(clave, None)
+        respuesta = _json(await self.simular(pedido))
+        return HTTPStatus.OK, self.respuestas.obtener(clave, lambda: respuesta)
+
+    async def atender(self, lector, escritor):
+        # una conexión HTTP/1.1: se atienden pedidos hasta que el cliente la cierre
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea.strip():
+                    break
+                try:
+                    metodo, destino, version = linea.decode('latin-1').split()
+                except ValueError:
+                    await self._responder(escritor, HTTPStatus.BAD_REQUEST,
+                                          _json({'error': 'Línea de pedido inválida'}), cerrar=True)
+                    break
+                encabezados = {}
+                while True:
+                    linea = await lector.readline()
+                    if linea in (b'\r\n', b'\n', b''):
+                        break
+                    nombre, _, valor = linea.decode('latin-1').partition(':')
+                    encabezados[nombre.strip().lower()] = valor.strip()
+                largo = int(encabezados.get('content-length') or 0)
+                if largo > MAXIMO_CUERPO:
+                    await self._responder(escritor, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                          _json({'error': 'El cuerpo es demasiado grande'}), cerrar=True)
+                    break
+                cuerpo = await lector.readexactly(largo) if largo else b''
+
+                self.pedidos += 1
+                try:
+                    estado, respuesta = await self.manejar(metodo, destino, cuerpo)
+                except ErrorPedido as error:
+                    estado, respuesta = error.estado, _json({'error': str(error)})
+                except (ValueError, TypeError) as error:
+                    # parámetros que el modelo no acepta
+                    estado, respuesta = HTTPStatus.BAD_REQUEST, _json({'error': str(error)})
+                except Exception as error:
+                    estado, respuesta = HTTPStatus.INTERNAL_SERVER_ERROR, _json({'error': repr(error)})
+                cerrar = (encabezados.get('connection', '').lower() == 'close'
+                          or (version == 'HTTP/1.0' and encabezados.get('connection', '').lower() != 'keep-alive'))
+                await self._responder(escritor, estado, respuesta, cerrar)
+                if cerrar:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    @staticmethod
+    async def _responder(escritor, estado, cuerpo, cerrar=False):
+        estado = HTTPStatus(estado)
+        escritor.write(f'HTTP/1.1 {estado.value} {estado.phrase}\r\n'
+                       f'Content-Type: application/json; charset=utf-8\r\n'
+                       f'Content-Length: {len(cuerpo)}\r\n'
+                       f'Connection: {"close" if cerrar else "keep-alive"}\r\n\r\n'.encode('latin-1') + cuerpo)
+        await escritor.drain()
+
+    async def iniciar(self, host='127.0.0.1', puerto=8765):
+        return await asyncio.start_server(self.atender, host, puerto)
+
+
+def _escenario(pedido):
+    # sólo los parámetros del modelo; se validan acá para que un escenario inválido no haga fallar el lote
+    if not isinstance(pedido, dict):
+        raise ErrorPedido('El escenario debe ser un objeto JSON')
+    escenario = {clave: valor for clave, valor in pedido.items() if clave not in ('G', 'T', 'V', 'datos')}
+    armar_escenarios([escenario])
+    clave_parametros(escenario)
+    return escenario
+
+
+def _validar_clave(clave):
+    # la clave se une a una ruta: sólo un hash evita salir del directorio de tablas
+    if not isinstance(clave, str) or not _CLAVE_DATOS.fullmatch(clave):
+        raise ErrorPedido(f'Clave de datos inválida: {clave!r} (debe ser la devuelta por /datos)')
+
+
+def _leer_json(cuerpo):
+    try:
+        pedido = json.loads(cuerpo or b'{}')
+    except ValueError as error:
+        raise ErrorPedido(f'JSON inválido: {error}') from None
+    if not isinstance(pedido, dict):
+        raise ErrorPedido('El cuerpo debe ser un objeto JSON')
+    return pedido
+
+
+def _json(valor):
+    return json.dumps(valor, ensure_ascii=False, allow_nan=False).encode('utf-8')
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Servicio HTTP/JSON local del simulador de GFV.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--espera', type=float, default=ESPERA_LOTE * 1000,
+                        help='milisegundos que se esperan pedidos para armar un lote')
+    parser.add_argument('--directorio', type=Path, default=DIRECTORIO_COLUMNAR,
+                        help='dónde se guardan las tablas registradas')
+    parser.add_argument('--archivos', type=Path,
+                        help='directorio del que POST /datos puede leer archivos con {"ruta": ...}')
+    args = parser.parse_args(argumentos)
+
+    async def servir():
+        servicio = ServicioGFV(args.directorio, args.espera / 1000, args.archivos)
+        servidor = await servicio.iniciar(args.host, args.puerto)
+        print(f'Escuchando en http://{args.host}:{args.puerto}')
+        async with servidor:
+            await servidor.serve_forever()
+
+    try:
+        asyncio.run(servir())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Simulación por lotes desde la línea de comandos, sin Streamlit.
+
+Recorre la grilla (archivos x escenarios) repartiéndola entre procesos y
+escribe una única tabla resumen con energía, horas de funcionamiento y
+energía por estación de cada combinación.
+
+Ejemplo:
+    python simulador_lote.py datos/ "otros/*.parquet" -e escenarios.csv -o resumen.csv -j 32
+"""
+import argparse
+import glob
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from agregados_gfv import ESTACIONES
+from bloques_gfv import FILAS_POR_BLOQUE, procesar_archivo
+from lectura_gfv import FORMATOS, es_columnar, leer_registros
+
+
+def buscar_entradas(patrones):
+    """Archivos de datos indicados por directorios, rutas o patrones glob, ordenados."""
+    rutas = set()
+    for patron in patrones:
+        ruta = Path(patron)
+        if ruta.is_dir() and not es_columnar(ruta):
+            for formato in FORMATOS:
+                rutas.update(ruta.glob(f'*.{formato}'))
+            # directorios ya convertidos a columnar dentro del directorio indicado
+            rutas.update(hijo for hijo in ruta.iterdir() if hijo.is_dir() and es_columnar(hijo))
+        else:
+            rutas.update(Path(encontrada) for encontrada in glob.glob(patron))
+    return sorted(rutas)
+
+
+def leer_escenarios(ruta):
+    """Escenarios desde un .csv (una fila por escenario) o un .json (lista de objetos).
+
+    Las celdas vacías del .csv toman el valor estándar del parámetro.
+    """
+    escenarios = leer_registros(ruta)
+    for posicion, escenario in enumerate(escenarios):
+        escenario.setdefault('nombre', f'escenario_{posicion}')
+    return escenarios
+
+
+def _simular(ruta, escenarios, filas, paso_h):
+    # se ejecuta en un proceso hijo: lee el archivo una vez para todo el bloque de escenarios
+    resumen = procesar_archivo(ruta, escenarios, filas=filas, paso_h=paso_h)
+    totales = resumen.totales()
+    estaciones = resumen.por_estacion()
+
+    filas_resumen = []
+    for posicion, escenario in enumerate(escenarios):
+        fila = {'archivo': str(ruta), 'escenario': escenario['nombre'],
+                'energia (kWh)': totales['energia'][posicion],
+                'horas de funcionamiento': totales['horas_funcionamiento'][posicion],
+                'horas sin datos': totales['horas_sin_datos'][posicion],
+                'energia recortada (kWh)': totales['recortada'][posicion],
+                'energia bajo umbral (kWh)': totales['umbral'][posicion]}
+        for estacion in ESTACIONES:
+            fila[f'energia {estacion} (kWh)'] = estaciones[estacion]['energia'][posicion]
+        filas_resumen.append(fila)
+    return filas_resumen
+
+
+def armar_tareas(rutas, escenarios, trabajadores):
+    """Parte la grilla en tareas (archivo, bloque de escenarios).
+
+    Los escenarios de un mismo archivo se agrupan para leerlo pocas veces,
+    pero se parten lo suficiente como para que haya trabajo para todos.
+    """
+    bloques_por_archivo = max(1, math.ceil(4 * trabajadores / max(1, len(rutas))))
+    tamano = max(1, math.ceil(len(escenarios) / bloques_por_archivo))
+    return [(ruta, escenarios[inicio:inicio + tamano])
+            for ruta in rutas for inicio in range(0, len(escenarios), tamano)]
+
+
+def simular_lote(rutas, escenarios, trabajadores=None, filas=FILAS_POR_BLOQUE, paso_h=None):
+    """Tabla resumen de todas las combinaciones, en orden (archivo, escenario)."""
+    trabajadores = trabajadores or os.cpu_count() or 1
+    tareas = armar_tareas(rutas, escenarios, trabajadores)
+    argumentos = ([ruta for ruta, _ in tareas], [bloque for _, bloque in tareas],
+                  [filas] * len(tareas), [paso_h] * len(tareas))
+
+    if trabajadores == 1:
+        resultados = map(_simular, *argumentos)
+        filas_resumen = [fila for resultado in resultados for fila in resultado]
+    else:
+        # map conserva el orden de las tareas, así la salida no depende de qué proceso termina antes
+        with ProcessPoolExecutor(max_workers=trabajadores) as ejecutor:
+            filas_resumen = [fila for resultado in ejecutor.map(_simular, *argumentos)
+                             for fila in resultado]
+    return pd.DataFrame(filas_resumen)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Simulación por lotes del generador fotovoltaico.')
+    parser.add_argument('entradas', nargs='+',
+                        help='directorios, archivos o patrones glob con las series de G y T')
+    parser.add_argument('-e', '--escenarios', required=True,
+                        help='archivo .csv o .json con los parámetros de cada escenario')
+    parser.add_argument('-o', '--salida', help='archivo .csv de salida (por defecto, la salida estándar)')
+    parser.add_argument('-j', '--trabajadores', type=int, default=None,
+                        help='cantidad de procesos (por defecto, uno por núcleo)')
+    parser.add_argument('--filas', type=int, default=FILAS_POR_BLOQUE,
+                        help='filas por bloque de lectura')
+    parser.add_argument('--paso', type=float, default=None,
+                        help='paso nominal de muestreo en minutos (por defecto, se infiere de cada archivo)')
+    args = parser.parse_args(argumentos)
+
+    rutas = buscar_entradas(args.entradas)
+    if not rutas:
+        parser.error('no se encontraron archivos de entrada')
+    escenarios = leer_escenarios(args.escenarios)
+
+    paso_h = args.paso / 60 if args.paso else None
+    tabla = simular_lote(rutas, escenarios, args.trabajadores, args.filas, paso_h)
+    tabla.to_csv(args.salida if args.salida else sys.stdout, index=False)
+
+
+if __name__ == '__main__':
+    main()
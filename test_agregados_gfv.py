@@ -0,0 +1,29 @@
+"""Resumen diario de series con zona horaria."""
+import numpy as np
+import pandas as pd
+
+from agregados_gfv import ResumenDiario, resumir_tabla
+from bloques_gfv import procesar_por_bloques
+from modelo_gfv import PARAMETROS_UTN
+
+
+def test_dias_en_hora_local():
+    local = pd.date_range('2023-06-01', '2023-06-03 23:00', freq='h')
+    hora = np.asarray(local.hour)
+    tabla = pd.DataFrame({'G': np.clip(np.sin((hora - 7) / 10 * np.pi), 0, None) * 800, 'T': 15.0 + hora / 4},
+                         index=local)
+    con_zona = tabla.tz_localize('America/Argentina/Buenos_Aires')
+
+    _, resumen = resumir_tabla(con_zona, [PARAMETROS_UTN])
+    _, esperado = resumir_tabla(tabla, [PARAMETROS_UTN])
+    np.testing.assert_array_equal(resumen.dias, np.array(['2023-06-01', '2023-06-02', '2023-06-03'],
+                                                         dtype='datetime64[D]'))
+    np.testing.assert_array_equal(resumen.lapsos_por_dia, [24, 24, 24])
+    assert resumen.tramo_dia('2023-06-02') == slice(24, 48)
+    for campo in ResumenDiario.CAMPOS:
+        np.testing.assert_array_equal(resumen[campo], esperado[campo], err_msg=campo)
+
+    por_bloques = procesar_por_bloques((con_zona.iloc[inicio:inicio + 10] for inicio in range(0, 72, 10)),
+                                       [PARAMETROS_UTN])
+    for campo in ResumenDiario.CAMPOS:
+        np.testing.assert_array_equal(por_bloques[campo], esperado[campo], err_msg=campo)
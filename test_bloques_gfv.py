@@ -0,0 +1,109 @@
+"""Resumen por bloques frente al resumen en memoria, con faltantes y muestreo variable."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from agregados_gfv import ResumenDiario, resumir_tabla
+from bloques_gfv import AcumuladorDiario, procesar_archivo
+from lectura_gfv import convertir_a_columnar, leer_tabla
+from modelo_gfv import PARAMETROS_UTN
+
+ESCENARIOS = [PARAMETROS_UTN, {**PARAMETROS_UTN, 'Pinv': 1.8, 'mu': 0.05, 'NOCT': 45}]
+
+
+def serie(indice, semilla=0):
+    # día despejado con algo de ruido, así el inversor recorta en algunas muestras
+    azar = np.random.default_rng(semilla)
+    hora = indice.hour + indice.minute / 60
+    G = np.clip(np.sin((hora - 6) / 12 * np.pi), 0, None) * 1000 * azar.uniform(0.8, 1.1, len(indice))
+    T = 20 + 8 * np.sin((hora - 9) / 24 * 2 * np.pi) + azar.normal(0, 1, len(indice))
+    return pd.DataFrame({'G': G, 'T': T}, index=pd.DatetimeIndex(indice, name='Fecha'))
+
+
+def muestreo_mixto():
+    # registrador a 5 min que pasa a 15 min, con un corte de 2 h y algunas muestras sin G
+    indice = pd.date_range('2023-03-01', '2023-03-04 23:55', freq='5min').append(
+        pd.date_range('2023-03-05', '2023-03-09 23:45', freq='15min'))
+    indice = indice[(indice < '2023-03-07 10:15') | (indice >= '2023-03-07 12:15')]
+    tabla = serie(indice)
+    tabla.iloc[200:206, 0] = np.nan
+    return tabla
+
+
+def comparar(resumen, esperado):
+    np.testing.assert_array_equal(resumen.dias, esperado.dias)
+    np.testing.assert_array_equal(resumen.inicio, esperado.inicio)
+    for campo in ResumenDiario.CAMPOS:
+        np.testing.assert_array_equal(resumen[campo], esperado[campo], err_msg=campo)
+
+
+def guardar(tabla, formato, directorio):
+    ruta = directorio / f'serie.{formato}'
+    if formato == 'csv':
+        tabla.to_csv(ruta)
+    elif formato == 'parquet':
+        tabla.to_parquet(ruta)
+    elif formato == 'feather':
+        tabla.reset_index().to_feather(ruta)
+    elif formato == 'xlsx':
+        tabla.to_excel(ruta)
+    elif formato == 'columnar':
+        ruta = convertir_a_columnar(tabla, directorio / 'columnar')
+    return ruta
+
+
+@pytest.mark.parametrize('formato', ['csv', 'parquet', 'feather', 'xlsx', 'columnar', 'DataFrame'])
+def test_bloques_igual_que_en_memoria(formato, tmp_path):
+    tabla = muestreo_mixto()
+    if formato == 'DataFrame':
+        origen, completa = tabla, tabla
+    else:
+        origen = guardar(tabla, formato, tmp_path)
+        completa = tabla if formato == 'columnar' else leer_tabla(origen)
+    _, esperado = resumir_tabla(completa, ESCENARIOS)
+    for filas in (1, 7, 500, len(tabla)):
+        comparar(procesar_archivo(origen, ESCENARIOS, filas=filas), esperado)
+
+
+def test_potencia_por_bloques():
+    tabla = muestreo_mixto()
+    P, _ = resumir_tabla(tabla, ESCENARIOS)
+    acumulador = AcumuladorDiario(ESCENARIOS, guardar_potencia=True)
+    for inicio in range(0, len(tabla), 333):
+        acumulador.agregar(tabla.iloc[inicio:inicio + 333])
+    tramos = [potencia for _, potencia in acumulador.potencias]
+    tramos.append(acumulador.resumir_pendiente()[0])
+    np.testing.assert_array_equal(np.concatenate(tramos, axis=1), P)
+
+
+def test_faltantes_como_hueco():
+    # una muestra sin G o T cuenta igual que si no estuviera en la serie
+    tabla = serie(pd.date_range('2023-01-01', '2023-01-03 23:45', freq='15min'))
+    faltantes = np.zeros(len(tabla), dtype=bool)
+    faltantes[[40, 41, 42, 150]] = True
+    con_nan = tabla.copy()
+    con_nan.iloc[[40, 41, 42], 0] = np.nan
+    con_nan.iloc[150, 1] = np.nan
+
+    _, resumen = resumir_tabla(con_nan, ESCENARIOS, paso_h=0.25)
+    _, sin_muestras = resumir_tabla(tabla[~faltantes], ESCENARIOS, paso_h=0.25)
+    totales = resumen.totales()
+    assert np.isfinite(totales['energia']).all()
+    np.testing.assert_allclose(totales['horas_sin_datos'], 1.0)
+    np.testing.assert_allclose(totales['horas'] + totales['horas_sin_datos'], 72)
+    for campo, valor in sin_muestras.totales().items():
+        if campo not in ('lapsos', 'suma_potencia'):
+            np.testing.assert_allclose(totales[campo], valor, rtol=1e-12, err_msg=campo)
+    np.testing.assert_array_equal(resumen['lapsos_funcionamiento'] + resumen['lapsos_sin_funcionamiento'],
+                                  sin_muestras['lapsos'])
+    np.testing.assert_allclose(resumen.potencia_media(), sin_muestras.potencia_media(), rtol=1e-12)
+
+
+def test_cambio_de_muestreo_no_es_hueco():
+    tabla = muestreo_mixto()
+    _, resumen = resumir_tabla(tabla, ESCENARIOS)
+    sin_datos = resumen['horas_sin_datos'][0]
+    # sólo el corte de 2 h y las 6 muestras de 5 min sin G
+    np.testing.assert_allclose(sin_datos.sum(), 2 + 6 * 5 / 60)
+    np.testing.assert_allclose(resumen['horas'][0] + sin_datos, 24)
+    assert np.count_nonzero(sin_datos) == 2
@@ -0,0 +1,24 @@
+"""Energías diarias del análisis de incertidumbre frente al resumen diario."""
+import numpy as np
+import pandas as pd
+
+from agregados_gfv import resumir_tabla
+from incertidumbre_gfv import AnalisisIncertidumbre
+from modelo_gfv import PARAMETROS_UTN
+
+
+def test_dias_finales_sin_sol():
+    # el último día es un corte del registrador (G = 0) y el anterior termina con sol
+    indice = pd.date_range('2023-01-01', '2023-01-04 23:00', freq='h')
+    hora = np.asarray(indice.hour)
+    G = np.clip(np.sin((hora - 6) / 12 * np.pi), 0, None) * 900
+    G[indice.day == 3] = np.where(hora[indice.day == 3] == 23, 500.0, G[indice.day == 3])
+    G[indice.day == 4] = 0.0
+    tabla = pd.DataFrame({'G': G, 'T': 25.0}, index=indice)
+
+    analisis = AnalisisIncertidumbre(tabla)
+    escenarios = {clave: [valor] for clave, valor in PARAMETROS_UTN.items()}
+    _, resumen = resumir_tabla(tabla, [PARAMETROS_UTN])
+    diarias = analisis.energias_diarias(escenarios)
+    np.testing.assert_allclose(diarias[0], resumen['energia'][0], rtol=1e-12)
+    assert diarias[0, -1] == 0.0
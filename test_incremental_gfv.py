@@ -0,0 +1,78 @@
+"""CalculoIncremental frente al cálculo completo con resumir_tabla."""
+import math
+
+import numpy as np
+import pandas as pd
+
+from agregados_gfv import ResumenDiario, duraciones_h, resumir_tabla
+from incremental_gfv import CalculoIncremental
+from modelo_gfv import CURVA_RENDIMIENTO_TIPICA, PARAMETROS_UTN
+
+
+def tabla_con_viento():
+    azar = np.random.default_rng(1)
+    indice = pd.date_range('2023-06-01', '2023-06-10 23:50', freq='10min')
+    hora = np.asarray(indice.hour + indice.minute / 60)
+    G = np.clip(np.sin((hora - 7) / 10 * np.pi), 0, None) * 900 * azar.uniform(0.6, 1.1, len(indice))
+    T = 10 + 6 * np.sin((hora - 9) / 24 * 2 * np.pi)
+    V = azar.gamma(2, 1.5, len(indice))
+    V[::97] = np.nan
+    G[300:304] = np.nan
+    T[900] = np.nan
+    return pd.DataFrame({'G': G, 'T': T, 'Viento (m/s)': V}, index=indice)
+
+
+def cambiar(inputs, azar):
+    # uno o dos parámetros por paso, como al mover los controles de la app
+    nuevos = dict(inputs)
+    for nombre in azar.choice(['N', 'Ppico', 'kp', 'eta', 'Gstd', 'Tr', 'Pinv', 'mu', 'NOCT', 'curva_eta'],
+                              size=azar.integers(1, 3), replace=False):
+        if nombre == 'N':
+            nuevos['N'] = int(azar.integers(1, 30))
+        elif nombre == 'Ppico':
+            nuevos['Ppico'] = float(azar.uniform(100, 400))
+        elif nombre == 'kp':
+            nuevos['kp'] = float(azar.uniform(-0.006, -0.002))
+        elif nombre == 'eta':
+            nuevos['eta'] = float(azar.uniform(0.85, 0.99))
+        elif nombre == 'Gstd':
+            nuevos['Gstd'] = float(azar.uniform(800, 1200))
+        elif nombre == 'Tr':
+            nuevos['Tr'] = float(azar.uniform(20, 30))
+        elif nombre == 'Pinv':
+            nuevos['Pinv'] = float(azar.uniform(0.5, 6))
+        elif nombre == 'mu':
+            nuevos['mu'] = float(azar.uniform(0, 0.1))
+        elif nombre == 'NOCT':
+            nuevos['NOCT'] = math.nan if azar.random() < 0.3 else float(azar.uniform(40, 50))
+        else:
+            nuevos['curva_eta'] = None if nuevos.get('curva_eta') else CURVA_RENDIMIENTO_TIPICA
+    return nuevos
+
+
+def test_cambios_aleatorios_de_parametros():
+    tabla = tabla_con_viento()
+    calculo = CalculoIncremental(tabla)
+    duracion = duraciones_h(tabla.index, calculo.paso_h)[0]
+    azar = np.random.default_rng(7)
+    inputs = {**PARAMETROS_UTN, 'NOCT': math.nan, 'curva_eta': None}
+    for _ in range(60):
+        inputs = cambiar(inputs, azar)
+        P_r, energia, resumen = calculo.calcular(inputs)
+        P_esperada, esperado = resumir_tabla(tabla, [inputs])
+
+        np.testing.assert_allclose(P_r, P_esperada[0], rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(energia, P_esperada[0] * duracion, rtol=1e-12, atol=1e-12)
+        for campo in ResumenDiario.CAMPOS:
+            np.testing.assert_allclose(resumen[campo], esperado[campo], rtol=1e-12, atol=1e-12,
+                                       err_msg=f'{campo} con {inputs}')
+
+
+def test_solo_recalcula_lo_afectado():
+    calculo = CalculoIncremental(tabla_con_viento())
+    inputs = {**PARAMETROS_UTN, 'NOCT': 45.0}
+    calculo.calcular(inputs)
+    calculo.calcular({**inputs, 'mu': 0.05})
+    assert calculo.recalculados == ['resultados']
+    calculo.calcular({**inputs, 'mu': 0.05, 'N': 20})
+    assert calculo.recalculados == ['potencia_bruta', 'potencia_inversor', 'resultados']
@@ -0,0 +1,29 @@
+"""Columnas que se reconocen en las tablas de datos."""
+import numpy as np
+import pandas as pd
+
+from agregados_gfv import resumir_tabla
+from lectura_gfv import columna_viento, columnas_ignoradas
+from modelo_gfv import PARAMETROS_UTN
+
+
+def tabla(**extra):
+    indice = pd.date_range('2023-01-01', periods=48, freq='h')
+    G = np.clip(np.sin((np.asarray(indice.hour) - 6) / 12 * np.pi), 0, None) * 900
+    return pd.DataFrame({'G': G, 'T': 25.0, **extra}, index=indice)
+
+
+def test_viento_por_nombre():
+    assert columna_viento(tabla()) is None
+    assert columna_viento(tabla(**{'Viento (m/s)': 3.0})) == 'Viento (m/s)'
+    assert columna_viento(tabla(Humedad=60.0, Wind_speed=3.0)) == 'Wind_speed'
+    assert columnas_ignoradas(tabla(Humedad=60.0, Wind_speed=3.0)) == ['Humedad']
+
+
+def test_columna_ajena_no_es_viento():
+    # una tabla de resultados vuelta a subir trae la potencia como tercera columna
+    escenario = {**PARAMETROS_UTN, 'NOCT': 45}
+    _, esperado = resumir_tabla(tabla(), [escenario])
+    _, resumen = resumir_tabla(tabla(**{'Potencia (kW)': 1.5}), [escenario])
+    assert columna_viento(tabla(**{'Potencia (kW)': 1.5})) is None
+    np.testing.assert_array_equal(resumen['energia'], esperado['energia'])
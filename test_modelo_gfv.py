@@ -0,0 +1,39 @@
+"""Límite del inversor con valores calculados a mano."""
+import math
+
+import numpy as np
+
+from modelo_gfv import limitar_potencia
+
+
+def test_limites_del_inversor():
+    # P_inv = 2.5 kW y mu = 0.1: P_min = 0.25 kW; el umbral se alcanza con P <= P_min
+    P = np.array([0.1, 0.25, 0.5, 2.5, 3.0, 4.0])
+    Pr, recortada, umbral = limitar_potencia(P, 2.5, 0.1, 0.5)
+    np.testing.assert_array_equal(Pr, [0.0, 0.0, 0.5, 2.5, 2.5, 2.5])
+    # (3.0 - 2.5 + 4.0 - 2.5) kW x 0.5 h y (0.1 + 0.25) kW x 0.5 h
+    np.testing.assert_allclose(recortada, 1.0, rtol=1e-12)
+    np.testing.assert_allclose(umbral, 0.175, rtol=1e-12)
+
+
+def test_sin_inversor():
+    # sin inversor no hay límite ni umbral, aunque mu no sea cero
+    P = np.array([0.0, 0.1, 0.25, 3.0, 40.0])
+    Pr, recortada, umbral = limitar_potencia(P, math.inf, 0.2, 0.25)
+    np.testing.assert_array_equal(Pr, P)
+    assert recortada == 0.0 and umbral == 0.0
+
+
+def test_escenarios_y_tramos():
+    # dos escenarios (con y sin inversor), duración por lapso y dos tramos; P_r se escribe sobre P
+    P = np.array([[0.2, 1.0, 3.0, 0.3, 5.0],
+                  [0.2, 1.0, 3.0, 0.3, 5.0]])
+    paso_h = np.array([0.5, 0.5, 0.5, 1.0, 1.0])
+    Pr, recortada, umbral = limitar_potencia(P, [2.0, math.inf], [0.2, 0.2], paso_h, out=P,
+                                             segmentos=np.array([0, 3]))
+    assert Pr is P
+    np.testing.assert_array_equal(Pr, [[0.0, 1.0, 2.0, 0.0, 2.0],
+                                       [0.2, 1.0, 3.0, 0.3, 5.0]])
+    # P_min = 0.4 kW: se anulan 0.2 kW x 0.5 h en el primer tramo y 0.3 kW x 1 h en el segundo
+    np.testing.assert_allclose(recortada, [[0.5, 3.0], [0.0, 0.0]], rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(umbral, [[0.1, 0.3], [0.0, 0.0]], rtol=1e-12, atol=1e-15)
@@ -0,0 +1,102 @@
+"""Servicio HTTP/JSON levantado en localhost, con un puerto libre."""
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+
+from agregados_gfv import resumir_tabla
+from modelo_gfv import PARAMETROS_UTN
+from servicio_gfv import ServicioGFV
+
+
+def tabla_de_prueba():
+    indice = pd.date_range('2023-01-01', '2023-01-20 23:50', freq='10min')
+    hora = np.asarray(indice.hour + indice.minute / 60)
+    G = np.clip(np.sin((hora - 6) / 12 * np.pi), 0, None) * 1000
+    return pd.DataFrame({'G': G, 'T': 18 + 8 * np.sin((hora - 9) / 24 * 2 * np.pi)}, index=indice)
+
+
+async def pedir(puerto, metodo, destino, cuerpo=b''):
+    if isinstance(cuerpo, dict):
+        cuerpo = json.dumps(cuerpo).encode()
+    lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+    escritor.write(f'{metodo} {destino} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(cuerpo)}\r\n'
+                   f'Connection: close\r\n\r\n'.encode() + cuerpo)
+    await escritor.drain()
+    respuesta = await lector.read()
+    escritor.close()
+    encabezado, _, datos = respuesta.partition(b'\r\n\r\n')
+    return int(encabezado.split()[1]), json.loads(datos)
+
+
+def con_servicio(prueba, **opciones):
+    async def correr():
+        servicio = ServicioGFV(**opciones)
+        servidor = await servicio.iniciar(puerto=0)
+        puerto = servidor.sockets[0].getsockname()[1]
+        async with servidor:
+            return await prueba(servicio, puerto)
+    return asyncio.run(correr())
+
+
+def test_lote_y_resultados(tmp_path):
+    tabla = tabla_de_prueba()
+    tabla.to_parquet(tmp_path / 'serie.parquet')
+    escenarios = [PARAMETROS_UTN, {**PARAMETROS_UTN, 'Pinv': 1.5}, {**PARAMETROS_UTN, 'mu': 0.2},
+                  {**PARAMETROS_UTN, 'NOCT': 45}]
+
+    async def prueba(servicio, puerto):
+        estado, registro = await pedir(puerto, 'POST', '/datos?nombre=serie.parquet',
+                                       (tmp_path / 'serie.parquet').read_bytes())
+        assert estado == 200 and registro['filas'] == len(tabla)
+        respuestas = await asyncio.gather(*(
+            pedir(puerto, 'POST', '/simular', {'datos': registro['datos'], 'escenario': escenario,
+                                               'agregados': ['total', 'diario']})
+            for escenario in escenarios))
+        # los cuatro pedidos simultáneos sobre la misma tabla se calculan en un solo lote
+        assert servicio.lotes == 1
+        await pedir(puerto, 'POST', '/simular', {'datos': registro['datos'], 'escenario': escenarios[1]})
+        assert servicio.lotes == 1
+        return respuestas
+
+    respuestas = con_servicio(prueba, directorio=tmp_path / 'tablas', espera=0.05)
+    _, esperado = resumir_tabla(tabla, escenarios)
+    totales = esperado.totales()
+    for fila, (estado, respuesta) in enumerate(respuestas):
+        assert estado == 200
+        for campo, valor in respuesta['total'].items():
+            np.testing.assert_allclose(valor, totales[campo][fila], rtol=1e-12, err_msg=campo)
+        np.testing.assert_allclose(respuesta['diario']['energia'], esperado['energia'][fila], rtol=1e-12)
+
+
+def test_errores(tmp_path):
+    async def prueba(servicio, puerto):
+        assert (await pedir(puerto, 'GET', '/nada'))[0] == 404
+        assert (await pedir(puerto, 'GET', '/simular'))[0] == 405
+        assert (await pedir(puerto, 'POST', '/simular', b'{no es json'))[0] == 400
+        assert (await pedir(puerto, 'POST', '/simular', {'datos': '../../etc'}))[0] == 400
+        desconocida = {'datos': '0' * 64, 'escenario': PARAMETROS_UTN}
+        assert (await pedir(puerto, 'POST', '/simular', desconocida))[0] == 404
+        assert (await pedir(puerto, 'POST', '/potencia', {'G': 800, 'T': 25, 'V': 2.0, **PARAMETROS_UTN,
+                                                          'NOCT': 45}))[0] == 200
+        # sin --archivos no se leen archivos locales
+        assert (await pedir(puerto, 'POST', '/datos', {'ruta': str(tmp_path / 'serie.csv')}))[0] == 403
+
+    con_servicio(prueba, directorio=tmp_path / 'tablas')
+
+
+def test_rutas_dentro_de_archivos(tmp_path):
+    archivos = tmp_path / 'archivos'
+    archivos.mkdir()
+    tabla_de_prueba().to_csv(archivos / 'serie.csv')
+    tabla_de_prueba().to_csv(tmp_path / 'afuera.csv')
+
+    async def prueba(servicio, puerto):
+        estado, registro = await pedir(puerto, 'POST', '/datos', {'ruta': 'serie.csv'})
+        assert estado == 200 and registro['filas'] == len(tabla_de_prueba())
+        assert (await pedir(puerto, 'POST', '/datos', {'ruta': '../afuera.csv'}))[0] == 403
+        assert (await pedir(puerto, 'POST', '/datos', {'ruta': str(tmp_path / 'afuera.csv')}))[0] == 403
+        assert (await pedir(puerto, 'POST', '/datos', {'ruta': 'no_existe.csv'}))[0] == 404
+
+    con_servicio(prueba, directorio=tmp_path / 'tablas', archivos=archivos)
@@ -0,0 +1,78 @@
+"""Modo en vivo: archivos que crecen mientras se los sigue."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from agregados_gfv import ResumenDiario, resumir_tabla
+from modelo_gfv import PARAMETROS_UTN
+from vivo_gfv import ProcesoVivo
+
+ESCENARIOS = [PARAMETROS_UTN, {**PARAMETROS_UTN, 'Pinv': 1.8, 'mu': 0.05}]
+
+
+def registro():
+    indice = pd.date_range('2023-02-01', '2023-02-05 23:50', freq='10min', name='Fecha')
+    hora = np.asarray(indice.hour + indice.minute / 60)
+    azar = np.random.default_rng(3)
+    G = np.clip(np.sin((hora - 6) / 12 * np.pi), 0, None) * 1000 * azar.uniform(0.7, 1.1, len(indice))
+    # con los decimales de un registrador, así leer el CSV devuelve exactamente los mismos valores
+    return pd.DataFrame({'G': G, 'T': 22 + 6 * np.sin((hora - 9) / 24 * 2 * np.pi)}, index=indice).round(2)
+
+
+def comparar(proceso, tabla):
+    P, esperado = resumir_tabla(tabla, ESCENARIOS)
+    resumen = proceso.resumen()
+    for campo in ResumenDiario.CAMPOS:
+        np.testing.assert_array_equal(resumen[campo], esperado[campo], err_msg=campo)
+    reciente = proceso.potencia_reciente(horas=24)
+    np.testing.assert_array_equal(reciente.to_numpy(), P[0, tabla.index > tabla.index[-1] - pd.Timedelta(hours=24)])
+
+
+def test_csv_con_linea_a_medio_escribir(tmp_path):
+    tabla = registro()
+    texto = tabla.to_csv()
+    # cortes en medio de una línea: esa fila se procesa recién cuando llega su salto de línea
+    cortes = [0, len(texto) // 3 + 7, 2 * len(texto) // 3 - 5, len(texto)]
+    ruta = tmp_path / 'registro.csv'
+    ruta.write_text('')
+    proceso = ProcesoVivo(ruta, ESCENARIOS)
+    leidas = 0
+    for desde, hasta in zip(cortes[:-1], cortes[1:]):
+        with open(ruta, 'a') as archivo:
+            archivo.write(texto[desde:hasta])
+        leidas += proceso.actualizar()
+        completas = texto[:hasta].count('\n') - 1
+        assert leidas == completas
+    assert proceso.actualizar() == 0
+    comparar(proceso, tabla)
+
+
+def test_parquet_reescrito(tmp_path):
+    tabla = registro()
+    ruta = tmp_path / 'registro.parquet'
+    proceso = ProcesoVivo(ruta, ESCENARIOS)
+    assert proceso.actualizar() == 0
+    for filas, grupo in ((200, None), (450, None), (len(tabla), 100)):
+        # to_parquet reescribe el archivo entero, casi siempre en un solo grupo de filas
+        tabla.iloc[:filas].to_parquet(ruta, row_group_size=grupo)
+        proceso.actualizar()
+        assert proceso.filas == filas
+    comparar(proceso, tabla)
+
+    tabla.iloc[:300].to_parquet(ruta)
+    with pytest.raises(ValueError):
+        proceso.actualizar()
+
+
+def test_directorio(tmp_path):
+    tabla = registro()
+    proceso = ProcesoVivo(tmp_path, ESCENARIOS)
+    tabla.iloc[:250].to_csv(tmp_path / '01.csv')
+    assert proceso.actualizar() == 250
+    # el archivo siguiente puede nombrar distinto sus columnas y llegar en otro formato
+    tabla.iloc[250:600].set_axis(['Irradiancia', 'Temperatura'], axis=1).to_parquet(tmp_path / '02.parquet')
+    (tmp_path / 'notas.txt').write_text('no es un registro')
+    assert proceso.actualizar() == 350
+    tabla.iloc[600:].to_csv(tmp_path / '03.csv')
+    assert proceso.actualizar() == len(tabla) - 600
+    comparar(proceso, tabla)
@@ -0,0 +1,200 @@
+"""Modo en vivo: resultados que se extienden a medida que el registrador agrega muestras.
+
+Se sigue un archivo (o un directorio de archivos) CSV o Parquet al que sólo
+se le agregan filas. Cada actualización lee únicamente lo nuevo, calcula la
+potencia de esas filas y extiende el resumen diario con AcumuladorDiario:
+el costo depende de lo que llegó y del día en curso, no del largo de la
+historia.
+"""
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bloques_gfv import AcumuladorDiario
+from lectura_gfv import extension, normalizar_tabla
+
+FORMATOS_VIVO = ('csv', 'parquet')
+
+
+class _SeguidorCSV:
+    # recuerda hasta qué byte se leyó; una línea sin salto final todavía se está escribiendo
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self.posicion = 0
+        self.columnas = None
+
+    def nuevas(self):
+        tamano = self.ruta.stat().st_size
+        if tamano < self.posicion:
+            raise ValueError(f'{self.ruta.name} se acortó: el modo en vivo sólo admite agregar filas')
+        if tamano == self.posicion:
+            return None
+        with open(self.ruta, 'rb') as archivo:
+            archivo.seek(self.posicion)
+            datos = archivo.read(tamano - self.posicion)
+        fin = datos.rfind(b'\n') + 1
+        if fin == 0:
+            return None
+        datos = datos[:fin]
+        self.posicion += fin
+
+        if self.columnas is None:
+            encabezado, _, datos = datos.partition(b'\n')
+            self.columnas = list(pd.read_csv(io.BytesIO(encabezado), nrows=0).columns)
+        if not datos.strip():
+            return None
+        tabla = pd.read_csv(io.BytesIO(datos), header=None, names=self.columnas,
+                            index_col=0, parse_dates=True)
+        return normalizar_tabla(tabla)
+
+
+class _SeguidorParquet:
+    # el registrador reescribe el archivo con las filas nuevas al final, en grupos de filas nuevos
+    # o en los mismos (to_parquet suele dejar uno solo): se cuentan filas, no grupos
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self.filas = 0
+        self.firma = None
+
+    def nuevas(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        estado = self.ruta.stat()
+        firma = (estado.st_mtime_ns, estado.st_size)
+        if firma == self.firma:
+            return None
+        try:
+            archivo = pq.ParquetFile(self.ruta)
+            metadatos = archivo.metadata
+            total = metadatos.num_rows
+            if total < self.filas:
+                raise ValueError(f'{self.ruta.name} perdió filas: el modo en vivo sólo admite agregar filas')
+            tabla = None
+            if total > self.filas:
+                # se leen desde el grupo que contiene la primera fila nueva
+                primero, anteriores = 0, 0
+                while anteriores + metadatos.row_group(primero).num_rows <= self.filas:
+                    anteriores += metadatos.row_group(primero).num_rows
+                    primero += 1
+                tabla = archivo.read_row_groups(range(primero, metadatos.num_row_groups))
+                tabla = tabla.slice(self.filas - anteriores)
+        except (OSError, pa.ArrowInvalid):
+            # el archivo se está escribiendo: se reintenta en la próxima actualización
+            return None
+        self.firma = firma
+        self.filas = total
+        return None if tabla is None else normalizar_tabla(tabla.to_pandas())
+
+
+class SeguidorArchivo:
+    """Devuelve, en cada llamada a nuevas(), sólo las filas agregadas desde la anterior.
+
+    ruta puede ser un archivo .csv o .parquet o un directorio: en ese caso se
+    siguen todos sus archivos de esos formatos, en orden de nombre, incluidos
+    los que aparezcan después.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self.columnas = None
+        self._seguidores = {}
+
+    def _archivos(self):
+        if self.ruta.is_dir():
+            return sorted(hijo for hijo in self.ruta.iterdir() if extension(hijo) in FORMATOS_VIVO)
+        if extension(self.ruta) not in FORMATOS_VIVO:
+            raise ValueError(f'El modo en vivo sigue archivos {" o ".join(FORMATOS_VIVO)}, '
+                             f'no .{extension(self.ruta)}')
+        return [self.ruta] if self.ruta.exists() else []
+
+    def nuevas(self):
+        partes = []
+        for ruta in self._archivos():
+            if ruta not in self._seguidores:
+                self._seguidores[ruta] = (_SeguidorCSV(ruta) if extension(ruta) == 'csv'
+                                          else _SeguidorParquet(ruta))
+            tabla = self._seguidores[ruta].nuevas()
+            if tabla is None or not len(tabla):
+                continue
+            # cada archivo puede nombrar distinto sus columnas: vale la posición, como en columnas_GT
+            if self.columnas is None:
+                self.columnas = list(tabla.columns)
+            elif len(tabla.columns) == len(self.columnas):
+                tabla = tabla.set_axis(self.columnas, axis=1)
+            partes.append(tabla)
+        if not partes:
+            return None
+        return partes[0] if len(partes) == 1 else pd.concat(partes)
+
+
+class ProcesoVivo:
+    """Resumen diario y potencia reciente de una serie que crece.
+
+    Las filas que llegan fuera de orden (anteriores a la última procesada)
+    se descartan y se cuentan en descartadas.
+    """
+
+    def __init__(self, origen, escenarios, paso_h=None):
+        self.seguidor = SeguidorArchivo(origen)
+        self.acumulador = AcumuladorDiario(escenarios, paso_h, guardar_potencia=True)
+        self.ultimo = None
+        self.filas = 0
+        self.descartadas = 0
+        # (potencia, resumen) del día en curso, que se rehace en cada actualización
+        self._pendiente = None
+        self._resumen = None
+
+    def actualizar(self):
+        """Procesa las filas nuevas y devuelve cuántas se agregaron."""
+        nuevas = self.seguidor.nuevas()
+        if nuevas is None:
+            return 0
+        nuevas = nuevas.sort_index(kind='stable')
+        nuevas = nuevas[~nuevas.index.duplicated(keep='last')]
+        if self.ultimo is not None:
+            viejas = nuevas.index <= self.ultimo
+            self.descartadas += int(viejas.sum())
+            nuevas = nuevas[~viejas]
+        if nuevas.empty:
+            return 0
+
+        self.acumulador.agregar(nuevas)
+        self.ultimo = nuevas.index[-1]
+        self.filas += len(nuevas)
+        # con una sola muestra todavía no se conoce el paso de muestreo
+        self._pendiente = (self.acumulador.resumir_pendiente()
+                           if self.acumulador.paso_h is not None else None)
+        self._resumen = None
+        return len(nuevas)
+
+    def resumen(self):
+        """ResumenDiario de todo lo recibido (None si todavía no hay datos suficientes)."""
+        if self._resumen is None and self.acumulador.paso_h is not None:
+            self._resumen = self.acumulador.resumen(self._pendiente)
+        return self._resumen
+
+    def potencia_reciente(self, horas=24, escenario=0):
+        """Potencia limitada (kW) de las últimas horas, armada desde el final de la historia."""
+        if self.ultimo is None:
+            return pd.Series(dtype=float, name='Potencia (kW)')
+        desde = self.ultimo - pd.Timedelta(hours=horas)
+        tramos = []
+        for indice, potencia in reversed(self.acumulador.potencias):
+            tramos.append((indice, potencia))
+            if indice[0] <= desde:
+                break
+        tramos.reverse()
+        if self._pendiente is not None:
+            tramos.append((self.acumulador.pendiente.index, self._pendiente[0]))
+        if not tramos:
+            return pd.Series(dtype=float, name='Potencia (kW)')
+
+        serie = pd.Series(np.concatenate([potencia[escenario] for _, potencia in tramos]),
+                          index=tramos[0][0].append([indice for indice, _ in tramos[1:]]),
+                          name='Potencia (kW)')
+        return serie[serie.index > desde]